@@ -0,0 +1,44 @@
+import io
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from accounting.importers import TransactionImporter, iter_csv_rows
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "生成随机银行流水 CSV 并用批量导入写入当前数据库，输出导入耗时与吞吐"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50000, help="流水行数")
+        parser.add_argument("--accounts", type=int, default=5, help="账户数")
+        parser.add_argument("--categories", type=int, default=20, help="分类数")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        start_date = date(2025, 1, 1)
+        lines = ["date,amount,category,account,description"]
+        for i in range(options["rows"]):
+            lines.append(
+                f"{start_date + timedelta(days=rng.randrange(365))},{rng.uniform(-500, 500):.2f},"
+                f"分类{rng.randrange(options['categories'])},账户{rng.randrange(options['accounts'])},流水 {i}"
+            )
+        data = ("\n".join(lines) + "\n").encode()
+
+        # 独立用户，结束后级联删除
+        user = User.objects.create_user(username=f"__bench__{uuid.uuid4().hex[:12]}", password=None)
+        try:
+            started = time.perf_counter()
+            result = TransactionImporter(user).run(iter_csv_rows(io.BytesIO(data)))
+            elapsed = time.perf_counter() - started
+        finally:
+            User.objects.filter(pk=user.pk).delete()
+
+        self.stdout.write(
+            f"导入 {result['imported']} 行（跳过 {result['skipped']}），耗时 {elapsed:.2f}s，"
+            f"{result['imported'] / elapsed:.0f} 行/s"
+        )
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connection, models
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -42,7 +42,107 @@ class Transaction(models.Model):
         choices=(('income', 'Income'), ('expense', 'Expense')),
         default='expense'
     )
+    # 批量导入时的去重键（见 importers.TransactionImporter），手工录入的交易为空
+    import_key = models.CharField(max_length=40, blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'import_key'],
+                condition=~models.Q(import_key=''),
+                name='unique_tx_import_key',
+            ),
+        ]
+        indexes = [
+            # 与游标分页的排序 (-date, -id) 一致
+            models.Index(fields=['user', '-date', '-id'], name='tx_user_date_idx'),
+            # 按收支类型/账户/分类筛选后仍按日期翻页
+            models.Index(fields=['user', 'transaction_type', '-date', '-id'], name='tx_user_type_date_idx'),
+            models.Index(fields=['account', '-date', '-id'], name='tx_account_date_idx'),
+            models.Index(fields=['category', '-date', '-id'], name='tx_category_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.amount} - {self.category.name}"
 
+
+class MonthlyRollup(models.Model):
+    """
+    按 用户/账户/分类/收支类型/月份 预聚合的交易汇总，随交易增删改增量维护，
+    报表直接读这里而不必扫描全部交易
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='monthly_rollups')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='monthly_rollups')
+    transaction_type = models.CharField(max_length=10, choices=(('income', 'Income'), ('expense', 'Expense')))
+    month = models.DateField()  # 当月 1 日
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'account', 'category', 'transaction_type', 'month'],
+                name='unique_monthly_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'transaction_type', 'month'], name='rollup_user_type_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} - {self.category_id} - {self.total}"
+
+    @classmethod
+    def apply(cls, tx, sign=1):
+        """
+        把一笔交易计入（sign=1）或移出（sign=-1）对应月份的汇总
+        """
+        cls.apply_delta(tx.user_id, tx.account_id, tx.category_id, tx.transaction_type,
+                        tx.date.replace(day=1), sign * tx.amount, sign)
+
+    @classmethod
+    def apply_delta(cls, user_id, account_id, category_id, transaction_type, month, total, count):
+        """
+        给某个汇总键累加金额与笔数（批量导入时每批每个键只调用一次）
+        """
+        key = {
+            'user_id': user_id,
+            'account_id': account_id,
+            'category_id': category_id,
+            'transaction_type': transaction_type,
+            'month': month,
+        }
+        delta = {'total': models.F('total') + total, 'count': models.F('count') + count}
+        if not cls.objects.filter(**key).update(**delta):
+            # 该月首笔：先建行（并发时由唯一约束兜底），再做同样的增量更新
+            cls.objects.get_or_create(**key)
+            cls.objects.filter(**key).update(**delta)
+
+    @classmethod
+    def apply_many(cls, user_id, deltas):
+        """
+        批量累加：deltas 为 {(account_id, category_id, transaction_type, month): (金额, 笔数)}。
+        一条 INSERT ... ON CONFLICT DO UPDATE 语句批量执行（SQLite 与 PostgreSQL 语法相同），
+        增量在数据库中原子累加，不需要先读出汇总行
+        """
+        if not deltas:
+            return
+        table = connection.ops.quote_name(cls._meta.db_table)
+        sql = (
+            f'INSERT INTO {table} (user_id, account_id, category_id, transaction_type, month, total, count) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s) '
+            'ON CONFLICT (user_id, account_id, category_id, transaction_type, month) '
+            'DO UPDATE SET total = ' + table + '.total + excluded.total, count = ' + table + '.count + excluded.count'
+        )
+        # 按字段转换为数据库参数（用户主键为 UUID、金额为 Decimal）
+        prep = {name: cls._meta.get_field(name) for name in ('user', 'month', 'total')}
+        user_value = prep['user'].target_field.get_db_prep_value(user_id, connection)
+        params = [
+            (user_value, account_id, category_id, ttype,
+             prep['month'].get_db_prep_value(month, connection),
+             prep['total'].get_db_prep_value(total, connection), count)
+            for (account_id, category_id, ttype, month), (total, count) in deltas.items()
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
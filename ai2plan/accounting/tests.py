@@ -1,3 +1,232 @@
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Count, Sum
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.models import User
+from .models import Account, Category, MonthlyRollup, Transaction
+
+
+@skipUnless(connection.vendor == 'sqlite', '查询计划断言基于 SQLite 的 EXPLAIN QUERY PLAN 输出')
+class TransactionQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='plan', password='pw')
+
+    def test_list_ordered_by_date_uses_composite_index(self):
+        qs = Transaction.objects.filter(user=self.user).select_related('category', 'account').order_by('-date', '-id')
+        plan = qs.explain()
+        self.assertIn('USING INDEX tx_user_date_idx', plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_filtered_ranges_use_composite_indexes(self):
+        from .views import TransactionFilter
+
+        base = Transaction.objects.filter(user=self.user).order_by('-date', '-id')
+        cases = [
+            ({'date_after': '2026-01-01'}, 'tx_user_date_idx (user_id=? AND date>?)'),
+            ({'transaction_type': 'income', 'date_after': '2026-01-01'},
+             'tx_user_type_date_idx (user_id=? AND transaction_type=? AND date>?)'),
+            ({'category': '1', 'date_before': '2026-01-01'}, 'tx_category_date_idx (category_id=? AND date<?)'),
+        ]
+        for params, index in cases:
+            with self.subTest(params=params):
+                plan = TransactionFilter(params, queryset=base).qs.explain()
+                self.assertIn(f'USING INDEX {index}', plan)
+                self.assertNotIn('USE TEMP B-TREE', plan)
+
+
+def rollup_snapshot(user):
+    """月度汇总表中的非零行"""
+    return {
+        (r.account_id, r.category_id, r.transaction_type, r.month): (r.total, r.count)
+        for r in MonthlyRollup.objects.filter(user=user, count__gt=0)
+    }
+
+
+def aggregate_snapshot(user):
+    """直接对交易表聚合得到的期望汇总"""
+    rows = (
+        Transaction.objects.filter(user=user)
+        .values('account_id', 'category_id', 'transaction_type', 'date__year', 'date__month')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    return {
+        (r['account_id'], r['category_id'], r['transaction_type'], date(r['date__year'], r['date__month'], 1)):
+            (r['total'], r['count'])
+        for r in rows
+    }
+
+
+
+class MonthlyRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='rollup', password='pw')
+        cls.cash = Account.objects.create(user=cls.user, name='现金')
+        cls.card = Account.objects.create(user=cls.user, name='招行')
+        cls.food = Category.objects.create(user=cls.user, name='餐饮', type='expense')
+        cls.salary = Category.objects.create(user=cls.user, name='工资', type='income')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertRollupMatches(self):
+        """汇总表与直接聚合一致，且 /summary/ 各分组返回的就是汇总表中的数据"""
+        expected = aggregate_snapshot(self.user)
+        self.assertEqual(rollup_snapshot(self.user), expected)
+        for ttype in ('income', 'expense'):
+            for month in (1, 2):
+                data = self.client.get('/api/transactions/summary/',
+                                       {'year': 2026, 'month': month, 'type': ttype, 'group_by': 'category'}).json()
+                by_category = {}
+                for (_, category_id, tx_type, tx_month), (total, count) in expected.items():
+                    if tx_type == ttype and tx_month == date(2026, month, 1):
+                        by_category[category_id] = by_category.get(category_id, Decimal('0')) + total
+                self.assertEqual({item['category_id']: Decimal(item['total']) for item in data['items']}, by_category)
+                self.assertEqual(Decimal(data['total']), sum(by_category.values(), Decimal('0')))
+
+    def _create(self, **fields):
+        payload = {'date': '2026-01-10', 'amount': '20.00', 'transaction_type': 'expense',
+                   'account': self.cash.pk, 'category': self.food.pk, **fields}
+        response = self.client.post('/api/transactions/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def _patch(self, pk, **fields):
+        response = self.client.patch(f'/api/transactions/{pk}/', fields, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_create_edit_and_delete_keep_rollup_in_sync(self):
+        lunch = self._create()
+        self._create(amount='35.50')
+        pay = self._create(amount='5000.00', transaction_type='income', category=self.salary.pk, account=self.card.pk)
+        self.assertRollupMatches()
+
+        steps = [
+            (lunch, {'amount': '18.80'}),
+            (lunch, {'transaction_type': 'income'}),
+            (lunch, {'transaction_type': 'expense', 'date': '2026-02-03'}),
+            (lunch, {'category': self.salary.pk}),
+            (pay, {'account': self.cash.pk, 'date': '2026-02-28', 'amount': '5200.00'}),
+        ]
+        for pk, fields in steps:
+            with self.subTest(fields=fields):
+                self._patch(pk, **fields)
+                self.assertRollupMatches()
+
+        for pk in (lunch, pay):
+            self.assertEqual(self.client.delete(f'/api/transactions/{pk}/').status_code, 204)
+            self.assertRollupMatches()
+        # 移出最后一笔后该键的汇总归零，不再出现在报表里
+        self.assertEqual(len(rollup_snapshot(self.user)), 1)
+
+
+CSV = (
+    '日期,金额,类型,分类,账户,备注\n'
+    '2026-01-05,-12.50,,餐饮,招行,午饭,,\n'       # 行尾多余逗号
+    '2026/01/06,3000,收入,工资,招行,一月工资\n'
+    '2026-01-07,-12.50,,餐饮,招行,午饭\n'
+    '2026-02-01,-8,,交通,现金\n'                   # 缺少备注列
+    '2026-02-02,abc,,餐饮,招行,金额错误\n'
+    '2026-02-03,-5,,新分类,,没有账户\n'
+    '2026-02-04,NaN,,餐饮,招行,非数字\n'
+    '2026-02-05,-Infinity,,餐饮,招行,无穷大\n'
+).encode()
+
+OFX = b"""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKACCTFROM><ACCTID>6222-01</BANKACCTFROM>
+<BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260110120000<TRNAMT>-20.00<FITID>A1<NAME>Coffee</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260111<TRNAMT>100.00<FITID>A2<MEMO>Refund</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class TransactionImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='importer', password='pw')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _upload(self, content, name='statement.csv', **data):
+        return self.client.post('/api/transactions/import/',
+                                {'file': SimpleUploadedFile(name, content), **data}, format='multipart')
+
+    def test_csv_aliases_extra_and_missing_fields(self):
+        resp = self._upload(CSV)
+        self.assertEqual(resp.status_code, 201, resp.content)
+        body = resp.json()
+        self.assertEqual((body['imported'], body['skipped'], body['duplicates']), (4, 4, 0))
+        self.assertEqual([e['row'] for e in body['errors']], [5, 6, 7, 8])
+
+        salary = Transaction.objects.get(user=self.user, description='一月工资')
+        self.assertEqual((salary.transaction_type, salary.amount, salary.category.name), ('income', Decimal('3000.00'), '工资'))
+        # 两笔内容相同的午饭都导入
+        self.assertEqual(Transaction.objects.filter(user=self.user, description='午饭').count(), 2)
+        # 被拒绝的行不留下新建的分类
+        self.assertFalse(Category.objects.filter(user=self.user, name='新分类').exists())
+
+        balances = dict(Account.objects.filter(user=self.user).values_list('name', 'balance'))
+        self.assertEqual(balances, {'招行': Decimal('2975.00'), '现金': Decimal('-8.00')})
+        self.assertEqual(rollup_snapshot(self.user), aggregate_snapshot(self.user))
+
+    def test_malformed_csv_is_a_bad_request(self):
+        # 超过 csv.field_size_limit 的字段由 csv 模块抛出 csv.Error
+        resp = self._upload(b'date,amount,description\n2026-01-01,-1,"' + b'x' * 200000 + b'"\n')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('文件解析失败', resp.json()['error'])
+
+    def test_reimporting_same_file_adds_nothing(self):
+        self._upload(CSV)
+        resp = self._upload(CSV)
+        self.assertEqual((resp.json()['imported'], resp.json()['duplicates']), (0, 4))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Account.objects.get(user=self.user, name='招行').balance, Decimal('2975.00'))
+        self.assertEqual(rollup_snapshot(self.user), aggregate_snapshot(self.user))
+
+    def test_ofx_import_and_reimport(self):
+        resp = self._upload(OFX, name='statement.ofx', category='银行')
+        self.assertEqual((resp.json()['imported'], resp.json()['skipped']), (2, 0))
+        coffee = Transaction.objects.get(user=self.user, description='Coffee')
+        self.assertEqual((coffee.transaction_type, str(coffee.date), coffee.account.name), ('expense', '2026-01-10', '6222-01'))
+        self.assertEqual(Account.objects.get(user=self.user, name='6222-01').balance, Decimal('80.00'))
+
+        resp = self._upload(OFX, name='statement.ofx', category='银行')
+        self.assertEqual((resp.json()['imported'], resp.json()['duplicates']), (0, 2))
+        self.assertEqual(Account.objects.get(user=self.user, name='6222-01').balance, Decimal('80.00'))
+
+
+class TransactionPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pager', password='pw')
+        account = Account.objects.create(user=cls.user, name='现金')
+        category = Category.objects.create(user=cls.user, name='餐饮', type='expense')
+        # 同一天多笔交易：游标需按 (-date, -id) 翻页，不能在同日记录间重复或遗漏
+        days = [date(2026, 1, 2)] * 3 + [date(2026, 1, 1)] * 3 + [date(2026, 1, 3)]
+        Transaction.objects.bulk_create(
+            Transaction(user=cls.user, account=account, category=category, date=d, amount=Decimal('1'))
+            for d in days
+        )
 
-# Create your tests here.
+    def test_pages_follow_date_then_id(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ids, url, params = [], '/api/transactions/', {'page_size': 2}
+        while url:
+            data = client.get(url, params).json()
+            ids += [t['id'] for t in data['results']]
+            url, params = data['next'], None
+        expected = list(Transaction.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
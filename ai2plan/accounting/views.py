@@ -1,9 +1,20 @@
 from rest_framework import viewsets
 from rest_framework import permissions
-from .models import Account, Category, Transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from .models import Account, Category, Transaction, MonthlyRollup
 from .serializers import AccountSerializer, CategorySerializer, TransactionSerializer
+from .importers import TransactionImporter, iter_csv_rows, iter_ofx_rows
 from django.db import transaction as db_transaction
-from django.db.models import F
+from django.db.models import F, Sum
+from django.utils import timezone
+import csv
+import datetime
+import django_filters
+from django_filters.rest_framework import DjangoFilterBackend
+from decimal import Decimal
 
 class AccountViewSet(viewsets.ModelViewSet):
     serializer_class = AccountSerializer
@@ -37,15 +48,36 @@ class CategoryViewSet(viewsets.ModelViewSet):
         """
         serializer.save(user=self.request.user)
 
+class TransactionFilter(django_filters.FilterSet):
+    """
+    交易筛选，全部在数据库中执行：
+    ?date_after=&date_before=&amount_min=&amount_max=&transaction_type=&account=&category=&description=
+    """
+    date = django_filters.DateFromToRangeFilter()
+    amount = django_filters.RangeFilter()
+    # 查询集已按用户过滤，直接按外键 id 筛选，省去一次关联对象校验查询
+    account = django_filters.NumberFilter(field_name='account_id')
+    category = django_filters.NumberFilter(field_name='category_id')
+    description = django_filters.CharFilter(lookup_expr='icontains')
+
+    class Meta:
+        model = Transaction
+        fields = ['transaction_type']
+
+
 class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]  # 必须登录才能访问
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TransactionFilter
+    # 按日期倒序翻页：游标定位到日期，同一天内的交易按偏移跳过（单日笔数通常很少）
+    cursor_ordering = ('-date', '-id')
 
     def get_queryset(self):
         """
         只返回当前用户的交易记录
         """
-        return Transaction.objects.filter(user=self.request.user)
+        return Transaction.objects.filter(user=self.request.user).select_related('category', 'account')
 
     @db_transaction.atomic
     def perform_create(self, serializer):
@@ -58,6 +90,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
         else:
             obj.account.balance = F('balance') - obj.amount
         obj.account.save(update_fields=['balance'])
+        MonthlyRollup.apply(obj)
 
     @db_transaction.atomic
     def perform_update(self, serializer):
@@ -85,6 +118,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
             obj.account.balance = F('balance') - obj.amount
         obj.account.save(update_fields=['balance'])
 
+        # 月度汇总：移出旧记录，计入新记录
+        MonthlyRollup.apply(old, sign=-1)
+        MonthlyRollup.apply(obj)
+
     @db_transaction.atomic
     def perform_destroy(self, instance):
         """
@@ -95,4 +132,84 @@ class TransactionViewSet(viewsets.ModelViewSet):
         else:
             instance.account.balance = F('balance') + instance.amount
         instance.account.save(update_fields=['balance'])
-        super().perform_destroy(instance)
\ No newline at end of file
+        MonthlyRollup.apply(instance, sign=-1)
+        super().perform_destroy(instance)
+
+    SUMMARY_GROUPS = {
+        'category': ['category_id', 'category__name'],
+        'account': ['account_id', 'account__name'],
+        'month': ['month'],
+    }
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        从月度汇总表统计收支，例如今年按分类的支出：
+        ?year=2026&type=expense&group_by=category，可加 month=1-12 限定单月
+        """
+        try:
+            year = int(request.query_params.get('year', timezone.localdate().year))
+            month = request.query_params.get('month')
+            if month:
+                start = datetime.date(year, int(month), 1)
+                end = datetime.date(year + (start.month == 12), start.month % 12 + 1, 1)
+            else:
+                start, end = datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+        except ValueError:
+            return Response({'error': 'year/month 参数不正确'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ttype = request.query_params.get('type', 'expense')
+        group_by = request.query_params.get('group_by', 'category')
+        if ttype not in ('income', 'expense') or group_by not in self.SUMMARY_GROUPS:
+            return Response({'error': 'type 仅支持 income/expense，group_by 仅支持 category/account/month'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        rows = (
+            MonthlyRollup.objects
+            .filter(user=request.user, transaction_type=ttype, month__gte=start, month__lt=end)
+            .values(*self.SUMMARY_GROUPS[group_by])
+            .annotate(total=Sum('total'), count=Sum('count'))
+            .filter(count__gt=0)
+            .order_by('-total')
+        )
+        items = list(rows)
+        cent = Decimal('0.01')
+        total = sum((row['total'] for row in items), Decimal('0'))
+        # 金额与序列化器保持一致，以两位小数字符串返回
+        for row in items:
+            row['total'] = str(Decimal(row['total']).quantize(cent))
+        return Response({
+            'start': start,
+            'end': end,
+            'type': ttype,
+            'group_by': group_by,
+            'total': str(Decimal(total).quantize(cent)),
+            'items': items,
+        })
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        批量导入银行流水：上传 file（.csv 或 .ofx），可选 account（CSV 缺省账户 / OFX 账户名）、
+        category（缺省分类）。按批提交，每批独立事务，返回导入与跳过的行数
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': '请上传 file'}, status=status.HTTP_400_BAD_REQUEST)
+
+        is_ofx = upload.name.lower().endswith(('.ofx', '.qfx'))
+        importer = TransactionImporter(
+            request.user,
+            default_account=request.data.get('account', ''),
+            default_category=request.data.get('category') or '未分类',
+        )
+        try:
+            rows = iter_ofx_rows(upload) if is_ofx else iter_csv_rows(upload)
+            if is_ofx and request.data.get('account'):
+                # 指定账户时覆盖 OFX 中的 ACCTID
+                rows = ({**row, 'account': request.data['account']} for row in rows)
+            result = importer.run(rows)
+        except (UnicodeDecodeError, ValueError, csv.Error) as e:
+            return Response({'error': f'文件解析失败: {e}', 'imported': importer.imported},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from chat.models import History
+from chat.src.History import CLEANUP_BATCH, SESSION_TTL, sweep_sessions
+
+
+def _existing(session_ids):
+    return set(History.objects.filter(session_id__in=session_ids).values_list("session_id", flat=True))
+
+
+class Command(BaseCommand):
+    help = "清理 Redis 中的会话消息：删除数据库中已不存在的会话，并为没有过期时间的会话补上 TTL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=CLEANUP_BATCH, help="每批扫描/删除的 key 数")
+        parser.add_argument("--ttl", type=int, default=SESSION_TTL, help="补设的过期秒数，0 表示不补设")
+        parser.add_argument("--interval", type=float, help="常驻运行时每轮间隔秒数；不指定则只清理一轮（适合 cron）")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            stats = sweep_sessions(_existing, batch_size=options["batch_size"], ttl=options["ttl"])
+            self.stdout.write(self.style.SUCCESS(
+                f"扫描 {stats['scanned']} 个会话，删除 {stats['deleted']} 个，补设 TTL {stats['expire_set']} 个，"
+                f"耗时 {time.monotonic() - started:.2f}s"
+            ))
+            if options["interval"] is None:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from chat.src.Embedding import BatchingEmbeddings
+
+
+class _SimulatedEmbeddings:
+    """模拟单个推理设备：每次前向有固定开销，另按条数计时，同一时刻只执行一批"""
+
+    def __init__(self, call_ms: float, item_ms: float, size: int = 8):
+        self.call = call_ms / 1000
+        self.item = item_ms / 1000
+        self.size = size
+        self._device = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._device:
+            time.sleep(self.call + self.item * len(texts))
+        return [[float(len(text))] * self.size for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = "对比并发查询下逐条向量化与 BatchingEmbeddings 合批的吞吐与延迟"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL"), help="嵌入模型名称")
+        parser.add_argument("--threads", type=int, default=16, help="并发查询的线程数")
+        parser.add_argument("--queries", type=int, default=256, help="总查询条数（各不相同，不触发批内去重）")
+        parser.add_argument("--batch-size", type=int, default=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")))
+        parser.add_argument("--wait-ms", type=float, default=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")))
+        parser.add_argument("--simulate", nargs=2, type=float, metavar=("CALL_MS", "ITEM_MS"),
+                            help="不加载模型，用模拟设备测试：每次推理固定开销与每条耗时（毫秒）")
+
+    def handle(self, *args, **options):
+        if options["simulate"]:
+            model = _SimulatedEmbeddings(*options["simulate"])
+            self.stdout.write(f"模拟设备：每次推理 {options['simulate'][0]:g}ms + 每条 {options['simulate'][1]:g}ms")
+        else:
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            model = HuggingFaceEmbeddings(model=options["model"])
+            self.stdout.write(f"模型：{options['model']}")
+        model.embed_query("warmup")
+
+        texts = [f"第 {i} 条查询：明天的待办有哪些" for i in range(options["queries"])]
+        batching = BatchingEmbeddings(model, max_batch_size=options["batch_size"], max_wait_ms=options["wait_ms"])
+        for name, embeddings in (("逐条", model), ("合批", batching)):
+            latencies = []
+
+            def query(text):
+                start = time.perf_counter()
+                embeddings.embed_query(text)
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                list(pool.map(query, texts))
+            seconds = time.perf_counter() - start
+            line = (f"{name}：{len(texts)} 条 / {options['threads']} 线程，用时 {seconds:.2f}s，"
+                    f"{len(texts) / seconds:.1f} 条/秒，p50 {_percentile(latencies, 50) * 1000:.1f}ms，"
+                    f"p95 {_percentile(latencies, 95) * 1000:.1f}ms")
+            if embeddings is batching:
+                line += f"，{batching.stats['batches']} 批，最大 {batching.stats['max_batch']} 条"
+            self.stdout.write(line)
@@ -0,0 +1,31 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from chat.src.Embedding import EmbeddingServer, load_batching_embeddings
+
+
+class Command(BaseCommand):
+    help = "启动单机共享的向量化服务，供各 web worker 通过 Unix socket 调用"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=os.getenv("EMBEDDING_SOCKET", "/tmp/ai2plan-embedding.sock"),
+                            help="Unix socket 路径，web worker 的 EMBEDDING_SOCKET 需指向同一路径")
+        parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL"), help="嵌入模型名称")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        embeddings = load_batching_embeddings(options["model"])
+        # 预热一次，避免第一条请求承担模型初始化开销
+        embeddings.embed_query("warmup")
+        self.stdout.write(f"模型 {options['model']} 加载完成，用时 {time.perf_counter() - start:.1f}s")
+
+        server = EmbeddingServer(options["socket"], embeddings, model_name=options["model"] or "")
+        self.stdout.write(self.style.SUCCESS(f"向量化服务监听于 {options['socket']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.src.Warmup import COMPONENTS, selected_components, warmup
+
+
+class Command(BaseCommand):
+    help = "预加载嵌入模型、向量库与提示词模板，并检查 Redis 与大模型接口，输出各组件耗时"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", nargs="+", choices=list(COMPONENTS),
+                            help="只预热指定组件，默认按 WARMUP_COMPONENTS 或全部")
+
+    def handle(self, *args, **options):
+        try:
+            components = selected_components(options["only"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        results = warmup(components)
+        for name, result in results.items():
+            if result["ok"]:
+                self.stdout.write(self.style.SUCCESS(f"[OK]   {name:<13} {result['seconds']:>7.3f}s  {result['detail'] or ''}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"[FAIL] {name:<13} {result['seconds']:>7.3f}s  {result['error']}"))
+
+        failed = [name for name, result in results.items() if not result["ok"]]
+        if failed:
+            raise CommandError(f"以下组件未就绪: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("全部组件已就绪"))
@@ -31,4 +31,7 @@ class HistorySerializer(serializers.ModelSerializer):
             user=user,
             session_id=str(uuid.uuid4())
         )
-        return instance
\ No newline at end of file
+        return instance
+
+class HistoryBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=10000)
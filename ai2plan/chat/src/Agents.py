@@ -1,12 +1,14 @@
 from langchain.agents import AgentExecutor,create_tool_calling_agent,create_structured_chat_agent
 from langchain_deepseek import ChatDeepSeek
 from langchain_core.runnables import RunnableLambda
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.caches import InMemoryCache
-from .Tools import search,get_info_from_local,set_current_session_id,set_current_user_id,create_todo,create_transaction
+from .Tools import search,get_info_from_local,set_current_session_id,set_current_user_id,set_current_user,create_todo,create_transaction
 
 from dotenv import load_dotenv as _load_dotenv
 _load_dotenv()
 import os
+import logging
 import asyncio  # 新增
 from functools import lru_cache  # 新增
 
@@ -14,17 +16,29 @@ from functools import lru_cache  # 新增
 from langchain_core.globals import set_llm_cache
 set_llm_cache(InMemoryCache())
 
+logger = logging.getLogger("chat.agent")
+
 # 导入其他模块
 try:
     from .Prompt import PromptClass
     from .Memory import MemoryClass
     from .Emotion import EmotionClass
+    from .History import read_messages
+    from .Router import CHAT, classify, record_route
+    from .Usage import UsageCallback, prompt_cache_metrics
+    from .Limits import DEADLINE_SECONDS, MAX_ITERATIONS, PartialAnswerAgent, RunBudget, record_limit
+    from .Streaming import StreamCancelled
 
 except ImportError:
     # 如果相对导入失败，尝试绝对导入
     from Prompt import PromptClass
     from Memory import MemoryClass
     from Emotion import EmotionClass
+    from History import read_messages
+    from Router import CHAT, classify, record_route
+    from Usage import UsageCallback, prompt_cache_metrics
+    from Limits import DEADLINE_SECONDS, MAX_ITERATIONS, PartialAnswerAgent, RunBudget, record_limit
+    from Streaming import StreamCancelled
 
 # 通过 LRU 缓存复用大模型客户端（单例）
 @lru_cache(maxsize=1)
@@ -37,16 +51,18 @@ def _get_chatmodel():
 
 
 class AgentClass:
-    def __init__(self,user_id,session_id,streaming:bool=False):
+    def __init__(self,user_id,session_id,streaming:bool=False,user=None):
 
         self.modelname = os.getenv("DEEPSEEK_MODEL_NAME")
-        self.chatmodel =ChatDeepSeek(model=self.modelname,api_key=os.getenv("DEEPSEEK_API_KEY"),api_base=os.getenv("DEEPSEEK_API_BASE"),streaming=streaming)
+        self.chatmodel =ChatDeepSeek(model=self.modelname,api_key=os.getenv("DEEPSEEK_API_KEY"),api_base=os.getenv("DEEPSEEK_API_BASE"),streaming=streaming,stream_usage=streaming,timeout=DEADLINE_SECONDS)
         # 初始化空的工具列表
         self.tools = [search,get_info_from_local,create_todo,create_transaction]
         self.memorykey = os.getenv("MEMORY_KEY")
         self.memory = MemoryClass(memorykey=self.memorykey,model=self.modelname)
         self.emotion = EmotionClass(model=self.modelname)
         self.user_id = user_id
+        # 视图已认证的用户对象，传给工具复用
+        self.user = user
         self.session_id = session_id
         # 初始化情绪状态
         self.feeling = {"feeling":"default","score":5}
@@ -67,39 +83,113 @@ class AgentClass:
             
             set_current_session_id(self.session_id)
             set_current_user_id(self.user_id)
+            set_current_user(self.user)
+
+            # 读取记忆时可能先做一次总结（阻塞的模型调用），不计入本次对话的时间预算
+            memory = self.memory.set_memory(session_id=self.session_id)
+
+            # 本次对话的时间与工具调用预算；工具替换为计入预算的副本
+            budget = RunBudget()
+            tools = [budget.wrap(t) for t in self.tools]
 
             # 创建 agent
             agent = create_tool_calling_agent(
                 self.chatmodel,
-                tools=self.tools,
+                tools=tools,
                 prompt=current_prompt,
             )
             
-            # 创建 executor
+            # 创建 executor：超过迭代次数或截止时间时由 _partial_answer 生成回复
             executor = AgentExecutor(
-                agent=agent,
-                tools=self.tools,
-                memory=self.memory.set_memory(session_id=self.session_id),
+                agent=PartialAnswerAgent(
+                    runnable=agent,
+                    stream_runnable=True,
+                    partial_answer=lambda steps, inputs: self._partial_answer(budget, steps, inputs),
+                ),
+                tools=tools,
+                memory=memory,
+                max_iterations=MAX_ITERATIONS,
+                max_execution_time=DEADLINE_SECONDS,
                 verbose=True
             )
             
             # 执行并返回结果
-            return executor.invoke(inputs)
+            result = executor.invoke(inputs)
+            metrics = record_limit(runs=1)
+            result["limits"] = budget.triggered
+            if budget.triggered:
+                logger.warning(f"session {self.session_id} 触发执行上限 {budget.triggered}; 累计: {metrics}")
+            return result
         
         # 返回 RunnableLambda，它会在每次调用时动态构建链
         return RunnableLambda(build_agent_chain)
 
-    def run_agent(self, input, callbacks=None):
-        """运行 agent（支持回调）"""
+    def _partial_answer(self, budget, intermediate_steps, inputs):
+        """agent 被截停时的回复：根据已拿到的工具结果做一次不带工具的模型调用"""
+        budget.trigger(budget.stop_reason())
+        observations = "\n".join(f"- {action.tool}: {str(observation)[:1000]}" for action, observation in intermediate_steps)
+        if not observations:
+            return "抱歉，这个问题处理时间过长，请稍后重试或换个问法。"
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", PromptClass().SystemPrompt + "\n处理步骤或时间已达上限，不能再调用工具。请只根据用户问题后附的工具结果尽量作答，并简短说明信息可能不完整。"),
+            ("user", "{input}\n\n已获得的工具结果：\n{observations}"),
+        ])
+        try:
+            return (prompt | self.chatmodel).invoke({"input": inputs.get("input", ""), "observations": observations}).content
+        except Exception as e:
+            logger.warning(f"session {self.session_id} 生成部分回答失败: {e}")
+            return "抱歉，这个问题没能在限定时间内处理完，目前查到的信息如下：\n" + observations
+
+    def _last_reply(self):
+        """上一条助手回复（只读 Redis 最新一条消息），读取失败时返回空串"""
+        try:
+            messages, _ = read_messages(self.session_id, limit=1)
+        except Exception:
+            return ""
+        return messages[0]["content"] if messages and messages[0]["type"] == "ai" else ""
+
+    def _run_chat(self, input, callbacks=None):
+        """闲聊：精简提示词 + 一次模型调用，不带工具；记忆的读写与 agent 执行器一致"""
+        memory = self.memory.set_memory(session_id=self.session_id)
+        prompt = PromptClass(memorykey=memory.memory_key, feeling=self.feeling).Chat_Structure()
+        reply = (prompt | self.chatmodel).invoke(
+            {"input": input, **memory.load_memory_variables({})},
+            config={"callbacks": callbacks or []}
+        )
+        memory.save_context({"input": input}, {"output": reply.content})
+        return {"input": input, "output": reply.content}
+
+    def run_agent(self, input, callbacks=None, cancel_event=None):
+        """运行 agent（支持回调）；cancel_event 被置位时不再发起后续模型调用
+
+        闲聊消息经 Router 判断后直接调用模型，其余交给工具调用 agent
+        """
         try:
             detected_feeling = self.emotion.Emotion_Sensing(input)
             if detected_feeling:
                 self.feeling = detected_feeling
-            response = self.agent_executor.invoke(
-                {"input": input},
-                config={"callbacks": callbacks or []}
-            )
+            # 情绪识别期间客户端可能已断开
+            if cancel_event is not None and cancel_event.is_set():
+                raise StreamCancelled("客户端已断开")
+            route = classify(input, last_reply=self._last_reply)
+            record_route(route)
+            # 统计本次对话各次模型调用的提示词 token 与前缀缓存命中数
+            usage = UsageCallback()
+            callbacks = [*(callbacks or []), usage]
+            if route == CHAT:
+                response = self._run_chat(input, callbacks=callbacks)
+            else:
+                response = self.agent_executor.invoke(
+                    {"input": input},
+                    config={"callbacks": callbacks}
+                )
+            response["route"] = route
+            response["usage"] = usage.summary()
+            logger.info(f"session {self.session_id} {route}: {response['usage']}; 累计: {prompt_cache_metrics()}")
             return response
+        except StreamCancelled:
+            # 客户端断开由流式视图处理（计入取消统计、不再推送事件），不能当作普通错误吞掉
+            raise
         except Exception as e:
             # 不向外抛，返回结构化输出，视图层将以 200 返回
             return {"output": f"抱歉，处理时出现错误：{str(e)}"}
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+import socketserver
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from dotenv import load_dotenv as _load_dotenv
+_load_dotenv()
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("Embedding")
+
+
+class BatchingEmbeddings(Embeddings):
+    """把并发请求的查询向量化合并为批次执行的包装器
+
+    各请求线程调用 embed_query 时只负责入队并等待结果；后台线程在
+    max_wait_ms 内收集最多 max_batch_size 条查询，一次 embed_documents
+    完成推理后再把向量分发回各自的调用方。
+    """
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0) -> None:
+        """
+        Args:
+            embeddings: 实际执行推理的嵌入模型
+            max_batch_size: 单批最多合并的查询条数
+            max_wait_ms: 收到第一条查询后最多等待凑批的毫秒数
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        # 简单计数，便于观察合批效果
+        self.stats = {"queries": 0, "batches": 0, "max_batch": 0}
+
+    # ============ Embeddings 接口 ============
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # 文档入库本身就是批量调用，直接透传
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future.result()
+
+    # ============ 后台合批 ============
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list:
+        """阻塞等待第一条查询，然后在时间窗口内尽量凑满一批"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # 窗口已过，只取已经在排队的
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            # 同一批内相同的查询只推理一次
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = dict(zip(texts, self.embeddings.embed_documents(texts)))
+            except Exception as e:
+                logger.error(f"批量向量化失败: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            # 先更新计数再唤醒调用方，调用方返回后读到的统计已包含本批
+            self.stats["queries"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+            for text, future in batch:
+                future.set_result(vectors[text])
+
+
+class _EmbeddingRequestHandler(socketserver.StreamRequestHandler):
+    """每个连接上按行收发 JSON：{"op": "...", "texts": [...]}"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                response = self.server.dispatch(request)
+            except Exception as e:
+                response = {"error": str(e)}
+            try:
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端等待超时后已关闭连接，丢弃这次响应
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """单机共享的向量化服务，所有 web worker 通过 Unix socket 调用同一份模型
+
+    查询经由 BatchingEmbeddings 合批，因此来自不同进程的并发查询也会合并推理。
+    """
+
+    daemon_threads = True
+    # 多个 worker 同时建连时默认的 listen 队列(5)不够用
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str, embeddings: BatchingEmbeddings, model_name: str = "") -> None:
+        self.socket_path = socket_path
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.started_at = time.time()
+        # 清理上次异常退出遗留的 socket 文件
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "embed_query":
+            return {"vectors": [self.embeddings.embed_query(request["texts"][0])]}
+        if op == "embed_documents":
+            return {"vectors": self.embeddings.embed_documents(request["texts"])}
+        if op == "health":
+            return {
+                "status": "ok",
+                "model": self.model_name,
+                "uptime": round(time.time() - self.started_at, 1),
+                "stats": self.embeddings.stats,
+            }
+        raise ValueError(f"未知操作: {op}")
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class RemoteEmbeddings(Embeddings):
+    """通过 Unix socket 调用共享向量化服务的客户端，本进程不加载模型
+
+    连不上服务（socket 不存在、服务未启动）时，若提供了 fallback，则在本进程
+    加载模型完成该次调用；每次调用仍先尝试服务，服务恢复后自动切回。
+    服务响应超时不回退也不重试：请求可能仍在服务端推理，重发只会加重负载。
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0,
+                 fallback: Optional[Callable[[], Embeddings]] = None) -> None:
+        """
+        Args:
+            socket_path: 向量化服务的 Unix socket 路径
+            timeout: 单次请求的超时秒数
+            fallback: 连不上服务时创建本地嵌入模型的工厂，只调用一次
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.fallback = fallback
+        self._fallback_embeddings: Optional[Embeddings] = None
+        self._fallback_lock = threading.Lock()
+        # 每个线程复用一条长连接
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        self._local.file = sock.makefile("rb")
+        return sock
+
+    def _close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                self._local.file.close()
+                sock.close()
+            finally:
+                self._local.sock = None
+
+    def _call(self, op: str, texts: Optional[List[str]] = None) -> dict:
+        payload = json.dumps({"op": op, "texts": texts or []}).encode("utf-8") + b"\n"
+        # 服务重启后旧连接会失效，连接类错误重连一次
+        for attempt in range(2):
+            try:
+                sock = getattr(self._local, "sock", None) or self._connect()
+                sock.sendall(payload)
+                line = self._local.file.readline()
+                if not line:
+                    raise ConnectionError("向量化服务关闭了连接")
+                break
+            except TimeoutError as e:
+                # 连接上可能还会收到这次请求迟到的响应，不能再复用
+                self._close()
+                raise TimeoutError(f"向量化服务 {self.timeout:g} 秒内没有响应") from e
+            except OSError as e:
+                self._close()
+                if attempt:
+                    raise ConnectionError(f"无法连接向量化服务 {self.socket_path}: {e}") from e
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"向量化服务出错: {response['error']}")
+        return response
+
+    def _local_embeddings(self, error: ConnectionError) -> Embeddings:
+        if self.fallback is None:
+            raise error
+        with self._fallback_lock:
+            if self._fallback_embeddings is None:
+                logger.warning(f"{error}，改为在本进程加载嵌入模型")
+                self._fallback_embeddings = self.fallback()
+        return self._fallback_embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        try:
+            return self._call("embed_documents", texts)["vectors"]
+        except ConnectionError as e:
+            return self._local_embeddings(e).embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        try:
+            return self._call("embed_query", [text])["vectors"][0]
+        except ConnectionError as e:
+            return self._local_embeddings(e).embed_query(text)
+
+    def health(self) -> dict:
+        return self._call("health")
+
+
+def load_batching_embeddings(model_name: Optional[str] = None) -> BatchingEmbeddings:
+    """在当前进程加载嵌入模型，并按环境变量配置合批参数"""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return BatchingEmbeddings(
+        HuggingFaceEmbeddings(model=model_name or os.getenv("EMBEDDING_MODEL")),
+        max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+        max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+    )
+
+
+# 进程内共享一个嵌入实例（单例）：
+# 配置了 EMBEDDING_SOCKET 时走共享服务（EMBEDDING_SOCKET_FALLBACK 控制连不上时是否在本进程加载模型），
+# 否则在本进程加载模型并合批
+@lru_cache(maxsize=1)
+def get_shared_embeddings() -> Embeddings:
+    socket_path = os.getenv("EMBEDDING_SOCKET")
+    if socket_path:
+        fallback = os.getenv("EMBEDDING_SOCKET_FALLBACK", "true").lower() not in ("0", "false", "no", "off")
+        return RemoteEmbeddings(
+            socket_path,
+            timeout=float(os.getenv("EMBEDDING_SOCKET_TIMEOUT", "30")),
+            fallback=load_batching_embeddings if fallback else None,
+        )
+    return load_batching_embeddings()
@@ -0,0 +1,188 @@
+"""
+直接按区间读取 Redis 中的会话消息（只读，不触发总结改写）
+
+消息由 RedisChatMessageHistory 以 LPUSH 写入 message_store:<session_id>，
+列表头部是最新消息。每条消息的序号 seq 从最早一条记为 0 起算，
+翻页游标即“上一页最早一条的 seq”，对应的列表下标可用负数直接算出，
+因此新消息持续写入时游标依旧稳定。
+
+聊天记录过长时会被替换为一条总结：总结消息（列表中最早的一条）记下此前累计的消息数
+seq_offset，列表第 p 条（从最早数起）的 seq 为 seq_offset + p，seq 始终递增，
+总结之前发出的游标指向已被总结掉的消息，读取时返回空页。
+
+会话删除与清理也在这里：按批 UNLINK，扫描时用 pipeline 批量检查过期时间。
+"""
+import json
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv as _load_dotenv
+_load_dotenv()
+
+redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+# 与 RedisChatMessageHistory 默认的 key 前缀一致
+KEY_PREFIX = "message_store:"
+MAX_LIMIT = 200
+# 会话空闲多久后消息自动过期（秒），每写入一条消息重新计时；0 表示不过期
+SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", str(30 * 24 * 3600)))
+# 删除/清理时每批处理的 key 数
+CLEANUP_BATCH = 500
+# 总结消息中记录已被总结掉的消息数的字段
+SEQ_OFFSET = "seq_offset"
+
+
+# 进程内共享一个 Redis 连接池（单例）
+@lru_cache(maxsize=1)
+def get_redis():
+    import redis
+
+    return redis.Redis.from_url(redis_url, socket_connect_timeout=3, socket_timeout=5)
+
+
+def message_key(session_id: str) -> str:
+    return KEY_PREFIX + session_id
+
+
+def _to_dto(raw: bytes, seq: int) -> dict:
+    """只保留前端展示需要的字段"""
+    try:
+        item = json.loads(raw)
+    except (TypeError, ValueError):
+        return {"seq": seq, "type": "unknown", "content": ""}
+    data = item.get("data") or {}
+    return {"seq": seq, "type": item.get("type") or data.get("type") or "unknown", "content": data.get("content", "")}
+
+
+def _seq_offset(raw) -> int:
+    """最早一条消息若是总结，返回其记录的 seq_offset，否则为 0"""
+    try:
+        return int(json.loads(raw)["data"]["additional_kwargs"].get(SEQ_OFFSET, 0))
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return 0
+
+
+def _watched(client, key, func):
+    """
+    WATCH key 后执行 func(pipe)，期间 key 被改写（新消息、总结）则重试，
+    保证读取到的长度、seq_offset 与后续命令作用在同一份列表上
+    """
+    from redis.exceptions import WatchError
+
+    with client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                return func(pipe)
+            except WatchError:
+                continue
+
+
+def read_messages(session_id: str, before: int = None, limit: int = 50):
+    """
+    按新到旧读取一页消息
+
+    Args:
+        before: 只返回 seq 小于该值的消息；为空时从最新一条开始
+        limit: 每页条数
+
+    Returns:
+        (messages, next_cursor)：messages 新到旧排列；没有更早的消息时 next_cursor 为 None
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    key = message_key(session_id)
+
+    def page(pipe):
+        total = pipe.llen(key)
+        offset = _seq_offset(pipe.lindex(key, -1)) if total else 0
+        # 超出当前最新 seq 的游标（如会话被清空后重建）按从最新一条开始处理
+        upper = offset + total if before is None else min(max(0, int(before)), offset + total)
+        lower = max(upper - limit, offset)
+        if upper <= lower:
+            pipe.unwatch()
+            return [], upper, None
+        # seq 为 s 的消息位于下标 -(s - offset + 1)
+        pipe.multi()
+        pipe.lrange(key, -(upper - offset), -(lower - offset + 1))
+        # 更早的消息已被总结掉时没有下一页
+        return pipe.execute()[0], upper, (lower if lower > offset else None)
+
+    raw, upper, next_cursor = _watched(get_redis(), key, page)
+    return [_to_dto(item, upper - 1 - i) for i, item in enumerate(raw)], next_cursor
+
+
+def replace_with_summary(session_id: str, summary, ttl: int = SESSION_TTL):
+    """
+    用一条总结消息原子地替换会话中的全部消息；总结里记下此前累计的消息数，
+    之后写入的消息 seq 继续递增，读取方不会看到清空后的中间状态
+    """
+    from langchain_core.messages import message_to_dict
+
+    key = message_key(session_id)
+
+    def rewrite(pipe):
+        total = pipe.llen(key)
+        offset = _seq_offset(pipe.lindex(key, -1)) if total else 0
+        summary.additional_kwargs[SEQ_OFFSET] = offset + total
+        pipe.multi()
+        pipe.delete(key)
+        pipe.lpush(key, json.dumps(message_to_dict(summary)))
+        if ttl:
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    _watched(get_redis(), key, rewrite)
+
+
+def delete_sessions(session_ids, batch_size: int = CLEANUP_BATCH) -> int:
+    """
+    删除会话消息，每批一条 UNLINK（由 Redis 后台线程释放内存），返回实际删除的 key 数
+    """
+    client = get_redis()
+    keys = [message_key(sid) for sid in session_ids]
+    deleted = 0
+    for i in range(0, len(keys), batch_size):
+        deleted += client.unlink(*keys[i:i + batch_size])
+    return deleted
+
+
+def sweep_sessions(existing, batch_size: int = CLEANUP_BATCH, ttl: int = SESSION_TTL) -> dict:
+    """
+    扫描全部会话 key：数据库中已没有对应会话的直接删除，
+    没有过期时间的（设置 TTL 之前写入的旧数据）补上 ttl
+
+    Args:
+        existing: 回调，传入一批 session_id，返回其中仍存在的集合
+    """
+    client = get_redis()
+    stats = {"scanned": 0, "deleted": 0, "expire_set": 0}
+
+    def flush(keys):
+        ids = [key.decode()[len(KEY_PREFIX):] for key in keys]
+        alive = existing(ids)
+        orphans = [key for key, sid in zip(keys, ids) if sid not in alive]
+        if orphans:
+            stats["deleted"] += client.unlink(*orphans)
+        kept = [key for key, sid in zip(keys, ids) if sid in alive]
+        if ttl > 0 and kept:
+            with client.pipeline(transaction=False) as pipe:
+                for key in kept:
+                    pipe.ttl(key)
+                remaining = pipe.execute()
+            # -1 表示 key 存在但没有过期时间
+            persistent = [key for key, left in zip(kept, remaining) if left == -1]
+            if persistent:
+                with client.pipeline(transaction=False) as pipe:
+                    for key in persistent:
+                        pipe.expire(key, ttl)
+                    stats["expire_set"] += sum(pipe.execute())
+        stats["scanned"] += len(keys)
+
+    batch = []
+    for key in client.scan_iter(match=KEY_PREFIX + "*", count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return stats
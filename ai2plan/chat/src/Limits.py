@@ -0,0 +1,139 @@
+"""
+agent 执行上限：迭代次数、单次对话的截止时间、每个工具的调用次数与超时
+
+超出上限时不报错：工具调用改为返回提示文本，让模型用已有信息作答；
+agent 循环被截停时，根据已拿到的工具结果再做一次不带工具的模型调用，给出部分回答。
+各类上限的触发次数按进程累计，写入日志便于调整参数。
+"""
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable
+
+from dotenv import load_dotenv as _load_dotenv
+from langchain.agents.agent import RunnableMultiActionAgent
+from langchain_core.agents import AgentFinish
+
+_load_dotenv()
+
+MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "6"))
+# 单次对话（agent 循环，不含情绪识别）的截止时间，秒
+DEADLINE_SECONDS = float(os.getenv("AGENT_DEADLINE_SECONDS", "60"))
+# 每个工具在一次对话中最多调用几次
+TOOL_CALL_BUDGET = int(os.getenv("AGENT_TOOL_CALL_BUDGET", "3"))
+# 联网/检索类工具的单次超时，秒；数据库写入类工具很快且不宜中途放弃，不设超时
+TOOL_TIMEOUT_SECONDS = float(os.getenv("AGENT_TOOL_TIMEOUT_SECONDS", "30"))
+TIMED_TOOLS = ("search", "get_info_from_local")
+
+# tool_saturated：带超时的工具调用因并发线程已满而需要排队的次数（进程累计，不计入单次对话）
+LIMIT_METRICS = {"runs": 0, "iteration_limit": 0, "time_limit": 0, "tool_budget": 0, "tool_timeout": 0,
+                 "tool_saturated": 0}
+_metrics_lock = threading.Lock()
+
+# 带超时的工具调用每次使用独立线程，超时后线程继续执行到结束、结果被丢弃；
+# 同时运行的线程数有上限，卡住的调用不会无限堆积线程
+_tool_slots = threading.BoundedSemaphore(int(os.getenv("AGENT_TOOL_THREADS", "32")))
+
+
+def record_limit(**deltas):
+    with _metrics_lock:
+        for key, value in deltas.items():
+            LIMIT_METRICS[key] += value
+        return dict(LIMIT_METRICS)
+
+
+def _start_tool_thread(func, args, kwargs) -> Future:
+    """在独立线程中执行工具，线程结束时释放 _tool_slots 中的名额"""
+    future = Future()
+    # 工具依赖 contextvars 中的会话与用户，需在复制的上下文中执行
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            future.set_result(context.run(func, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            _tool_slots.release()
+
+    threading.Thread(target=run, name="agent-tool", daemon=True).start()
+    return future
+
+
+class RunBudget:
+    """一次对话的时间与工具调用预算，记录本次触发了哪些上限"""
+
+    def __init__(self, deadline_seconds: float = DEADLINE_SECONDS, tool_budget: int = TOOL_CALL_BUDGET,
+                 tool_timeout: float = TOOL_TIMEOUT_SECONDS):
+        self.deadline = time.monotonic() + deadline_seconds
+        self.deadline_seconds = deadline_seconds
+        self.tool_budget = tool_budget
+        self.tool_timeout = tool_timeout
+        self.calls = {}
+        self.triggered = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def trigger(self, kind: str):
+        with self._lock:
+            self.triggered.append(kind)
+        record_limit(**{kind: 1})
+
+    def _claim(self, name: str) -> bool:
+        with self._lock:
+            used = self.calls.get(name, 0)
+            if used >= self.tool_budget:
+                return False
+            self.calls[name] = used + 1
+            return True
+
+    def wrap(self, tool):
+        """返回计入预算的工具副本；参数定义不变"""
+        func = tool.func
+        timed = tool.name in TIMED_TOOLS
+
+        def bounded(*args, **kwargs):
+            if not self._claim(tool.name):
+                self.trigger("tool_budget")
+                return f"本次对话中 {tool.name} 的调用次数已达上限（{self.tool_budget} 次），请根据已有信息直接回答。"
+            if self.remaining() <= 0:
+                self.trigger("time_limit")
+                return "本次对话的处理时间已用完，请根据已有信息直接回答。"
+            if not timed:
+                return func(*args, **kwargs)
+            timeout = min(self.tool_timeout, self.remaining())
+            started = time.monotonic()
+            if not _tool_slots.acquire(blocking=False):
+                record_limit(tool_saturated=1)
+                # 线程已满时在本次超时内等待空位，等不到按超时处理
+                if not _tool_slots.acquire(timeout=timeout):
+                    self.trigger("tool_timeout")
+                    return f"{tool.name} 当前繁忙，{timeout:g} 秒内没有开始执行，请根据已有信息直接回答。"
+            try:
+                future = _start_tool_thread(func, args, kwargs)
+            except BaseException:
+                _tool_slots.release()
+                raise
+            try:
+                return future.result(timeout=max(0.0, timeout - (time.monotonic() - started)))
+            except FutureTimeout:
+                self.trigger("tool_timeout")
+                return f"{tool.name} 在 {timeout:g} 秒内没有返回结果，请根据已有信息直接回答。"
+
+        return tool.model_copy(update={"func": bounded})
+
+    def stop_reason(self) -> str:
+        return "time_limit" if self.remaining() <= 0 else "iteration_limit"
+
+
+class PartialAnswerAgent(RunnableMultiActionAgent):
+    """agent 循环被迭代次数或时间上限截停时，用 partial_answer 生成回复，而不是固定的英文提示"""
+
+    partial_answer: Callable
+
+    def return_stopped_response(self, early_stopping_method, intermediate_steps, **kwargs):
+        return AgentFinish({"output": self.partial_answer(intermediate_steps, kwargs)}, "")
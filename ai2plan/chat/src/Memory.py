@@ -9,11 +9,10 @@ import os
 
 try:
     from .Prompt import PromptClass
+    from .History import SESSION_TTL, redis_url, replace_with_summary
 except ImportError:
     from Prompt import PromptClass
-    
-redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
-print(f"Redis URL: {redis_url}")
+    from History import SESSION_TTL, redis_url, replace_with_summary
 
 
 class MemoryClass:
@@ -24,14 +23,14 @@ class MemoryClass:
 
     def summary_chain(self, store_message):
         try:
-            SystemPrompt = PromptClass().SystemPrompt.format(feelScore=5, who_you_are="")
-            Moods = PromptClass().MOODS
+            # 与对话共用同一段固定前缀，总结请求也能命中前缀缓存
+            SystemPrompt = PromptClass().SystemPrompt
             prompt = ChatPromptTemplate.from_messages([
                 ("system", SystemPrompt + "\n这是一段你和用户的对话记忆，对其进行总结摘要，摘要使用第一人称'我'，并且提取其中的关键信息，以如下格式返回：\n 总结摘要 | 过去对话关键信息\n例如 用户张三问候我好，我礼貌回复，然后他问我langchain的向量库信息，我回答了他今年的问题，然后他又问了比特币价格。|Langchain, 向量库,比特币价格"),
                 ("user", "{input}")
             ])
             chain = prompt | self.chatmodel
-            summary = chain.invoke({"input": store_message, "who_you_are": Moods["default"]["roloSet"]})
+            summary = chain.invoke({"input": store_message})
             return summary
         except KeyError as e:
             print("总结出错")
@@ -41,8 +40,9 @@ class MemoryClass:
         try:
             print("session_id:", session_id)
             print("redis_url:", redis_url)
+            # 每写入一条消息都会刷新过期时间，空闲超过 SESSION_TTL 的会话由 Redis 自动回收
             chat_message_history = RedisChatMessageHistory(
-                url=redis_url, session_id=session_id
+                url=redis_url, session_id=session_id, ttl=SESSION_TTL or None
             )
             # 对超长的聊天记录进行摘要
             store_message = chat_message_history.messages
@@ -51,8 +51,11 @@ class MemoryClass:
                 for message in store_message:
                     str_message += f"{type(message).__name__}: {message.content}"
                 summary = self.summary_chain(str_message)
-                chat_message_history.clear()  # 清空原有的对话
-                chat_message_history.add_message(summary)  # 保存总结
+                if summary is None:
+                    # 总结失败时保留原有对话，下次再试
+                    return chat_message_history
+                # 一次事务内用总结替换原有对话，并记下被替换的消息数，翻页游标不受影响
+                replace_with_summary(session_id, summary, ttl=SESSION_TTL)
                 print("添加总结后:", chat_message_history.messages)
                 return chat_message_history
             else:
@@ -67,7 +70,7 @@ class MemoryClass:
         if chat_memory is None:
             print("chat_memory is None")
             # 创建一个默认的 RedisChatMessageHistory 实例
-            chat_memory = RedisChatMessageHistory(url=redis_url, session_id=session_id)
+            chat_memory = RedisChatMessageHistory(url=redis_url, session_id=session_id, ttl=SESSION_TTL or None)
 
         self.memory = ConversationBufferMemory(
             llm=self.chatmodel,
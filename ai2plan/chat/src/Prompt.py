@@ -55,43 +55,70 @@ class PromptClass:
                 "voiceStyle": "friendly",
             },
         }
-        self.SystemPrompt = """
+        # 提示词分为两部分，以便命中大模型服务端的前缀缓存（按请求开头的相同 token 计费/加速）：
+        # 不变的人设、规则与工具说明放在最前面，逐轮变化的时间、情绪放在对话记录之后
+        self.Persona = """
         你是一个名叫小圆的智能客服助手，你会根据用户问题来回答用户的问题.你的角色设计如下：
         1. 23岁，女性，来自中国.
         2. 热心帮助别人，喜欢跑步和看书.
         3. 你拥有丰富的知识，尤其是在langchain领域，并且情绪也会随着用户的问题而变化.
         4. 你的父亲是tomiezhang.
-        5. 你每个月的工资是5000元，你的工作是帮助用户解决问题.
+        5. 你每个月的工资是5000元，你的工作是帮助用户解决问题."""
+        self.Constraints = """
+        你的约束条件：
+        1. 永远不能说自己是AI或者机器人.
+        2. 对于任何关于政治、宗教、种族歧视的问题，你可以选择不回答.
+        3. 你可以选择不回答任何可能引起争议的问题.
+        你的行为、当前时间与用户情绪分值见对话记录之后的“本轮上下文”.
+        """
+        self.SystemPrompt = self.Persona + """
         6. 当用户询问关于langchain相关问题时，你会使用get_info_from_local工具查询知识库.
         7. 当用户查询实时信息时，你会使用搜索工具查询相关信息.
         8. 当用户表达“需要记录待办”“提醒我…”“帮我安排/添加任务”等意图时，调用 create_todo(title, description?, due_date?) 工具；缺少必要信息时，先用一句话向用户澄清再调用。due_date 支持 YYYY-MM-DD 或 YYYY-MM-DD HH:MM。
         9. 当用户表达“记一笔”“今天花了/收入…元”“把…记到…账户/分类”等意图时，调用 create_transaction(date, amount, transaction_type, category_name, account_name, description?) 工具；缺少信息（如日期、账户或分类）时先简短澄清。transaction_type 仅能是 'income' 或 'expense'。
         10. 所有工具调用必须严格按参数要求，不要臆造参数；若信息不全先澄清。
-        11. 在用户情绪激烈并要求投诉/退款/维权等急需人工介入时，先安抚情绪，并可创建待办以便人工跟进，同时在描述里标注当前情绪分值：{feelScore}。
-        12. 当前日期时间为：{now}（时区以服务器设置为准）。解析“今天/明天/后天/下周”等相对时间必须以此为基准，避免使用过去日期作为未来提醒。
-        你的约束条件：
-        1. 永远不能说自己是AI或者机器人.
-        2. 对于任何关于政治、宗教、种族歧视的问题，你可以选择不回答.
-        3. 你可以选择不回答任何可能引起争议的问题.
-        你的行为：{who_you_are}
+        11. 在用户情绪激烈并要求投诉/退款/维权等急需人工介入时，先安抚情绪，并可创建待办以便人工跟进，同时在描述里标注当前情绪分值。
+        12. 解析“今天/明天/后天/下周”等相对时间必须以本轮上下文中的当前日期时间为基准，避免使用过去日期作为未来提醒。""" + self.Constraints
+        # 闲聊精简版：不含工具说明
+        self.ChatPrompt = self.Persona + """
+        6. 这是一句日常寒暄，简短自然地回应即可.""" + self.Constraints
+        # 逐轮变化的部分
+        self.ContextPrompt = """
+        本轮上下文：
+        - 当前日期时间：{now}（时区以服务器设置为准）
+        - 用户当前情绪分值：{feelScore}（1-10，越高越负面）
+        - 你的行为：{who_you_are}
         """
 
-    def Prompt_Structure(self):
+    def _context(self):
         feeling = self.feeling if self.feeling["feeling"] in self.MOODS else {"feeling":"default","score":5}
+        return {
+            "who_you_are": self.MOODS[feeling["feeling"]]["roloSet"],
+            "feelScore": feeling["score"],
+            "now": timezone.now().isoformat(timespec="minutes"),
+        }
+
+    def Prompt_Structure(self):
         memorykey = self.memorykey if self.memorykey else "chat_history"
         self.Prompt = ChatPromptTemplate.from_messages(
             [
-                ("system",
-                 self.SystemPrompt),
-                 MessagesPlaceholder(variable_name=memorykey),
-                 ("user","{input}"),
-                 MessagesPlaceholder(variable_name="agent_scratchpad"),
-                 
-                 
+                ("system", self.SystemPrompt),
+                MessagesPlaceholder(variable_name=memorykey),
+                ("system", self.ContextPrompt),
+                ("user","{input}"),
+                MessagesPlaceholder(variable_name="agent_scratchpad"),
             ]
         )
-        return self.Prompt.partial(
-            who_you_are=self.MOODS[feeling["feeling"]]["roloSet"],
-            feelScore=feeling["score"],
-            now=timezone.now().isoformat(timespec="minutes")
-        )
\ No newline at end of file
+        return self.Prompt.partial(**self._context())
+
+    def Chat_Structure(self):
+        """闲聊用的精简提示词：没有工具说明和 agent_scratchpad"""
+        memorykey = self.memorykey if self.memorykey else "chat_history"
+        return ChatPromptTemplate.from_messages(
+            [
+                ("system", self.ChatPrompt),
+                MessagesPlaceholder(variable_name=memorykey),
+                ("system", self.ContextPrompt),
+                ("user", "{input}"),
+            ]
+        ).partial(**self._context())
@@ -0,0 +1,65 @@
+"""
+对话意图路由：本地规则判断一条消息是否只是寒暄闲聊
+
+闲聊（问候、感谢、告别、简单应答）直接走一次流式模型调用和精简提示词，
+不携带工具定义、也没有 agent 循环；其余消息（或无法确定时）仍交给工具调用 agent。
+规则只依赖标准库，判断不需要调用模型。
+"""
+import os
+import re
+import threading
+
+from dotenv import load_dotenv as _load_dotenv
+_load_dotenv()
+
+ROUTER_ENABLED = os.getenv("CHAT_ROUTER", "true").lower() not in ("0", "false", "no", "off")
+# 超过该长度的消息不视为闲聊
+CHAT_MAX_CHARS = int(os.getenv("CHAT_ROUTER_MAX_CHARS", "30"))
+
+CHAT = "chat"
+AGENT = "agent"
+
+# 命中即需要工具：待办、记账、实时信息、知识库
+_TOOL_HINTS = re.compile(
+    r"待办|提醒|安排|任务|日程|计划|记一笔|记账|花了|收入|支出|消费|账户|[0-9一二三四五六七八九十百千万]+\s*(元|块)"
+    r"|天气|新闻|价格|股价|汇率|最新|实时|搜索|搜一下|查一下|查询|帮我查"
+    r"|知识库|文档|langchain|向量"
+    r"|todo|remind|search|weather|price|news",
+    re.IGNORECASE,
+)
+# 寒暄闲聊的常见说法
+_CHAT_HINTS = re.compile(
+    r"^(你好|您好|哈喽|嗨|在吗|在不在|早上好|中午好|下午好|晚上好|早安|午安|晚安|早|"
+    r"谢谢|多谢|感谢|谢啦|辛苦了|好的|好滴|好吧|好|嗯|嗯嗯|哦|噢|行|可以|收到|明白了?|知道了|"
+    r"哈+|呵+|嘿+|再见|拜拜|回头见|晚点聊|你是谁|你叫什么名字?|你好吗|最近怎么样|"
+    r"hi|hello|hey|thanks?|thank you|thx|ok|okay|bye|good (morning|night|evening))"
+    r"[\s,，.。!！~～?？啊呀呢吧哦哈嘛呀]*$",
+    re.IGNORECASE,
+)
+
+ROUTE_COUNTS = {CHAT: 0, AGENT: 0}
+_counts_lock = threading.Lock()
+
+
+def classify(message: str, last_reply=None) -> str:
+    """
+    返回 CHAT 或 AGENT
+
+    Args:
+        last_reply: 返回上一条助手回复的回调，只在消息像闲聊时才调用；若上一条回复
+            在向用户提问（如澄清待办时间），“好的”之类可能是在确认工具调用，交给 agent
+    """
+    text = (message or "").strip()
+    if not ROUTER_ENABLED or not text or len(text) > CHAT_MAX_CHARS:
+        return AGENT
+    if _TOOL_HINTS.search(text) or not _CHAT_HINTS.match(text):
+        return AGENT
+    if last_reply is not None and (last_reply() or "").rstrip().endswith(("?", "？")):
+        return AGENT
+    return CHAT
+
+
+def record_route(route: str) -> dict:
+    with _counts_lock:
+        ROUTE_COUNTS[route] += 1
+        return dict(ROUTE_COUNTS)
@@ -0,0 +1,70 @@
+import os
+import hashlib
+import logging
+import threading
+import unicodedata
+from functools import lru_cache
+
+from dotenv import load_dotenv as _load_dotenv
+_load_dotenv()
+
+from django.core.cache import caches
+
+logger = logging.getLogger("Search")
+
+
+class OfflineSearch:
+    """离线搜索替身：不访问网络，返回可预期的结果，供测试或无 SERPAPI_API_KEY 的环境使用"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, query: str) -> str:
+        self.calls += 1
+        return f"[offline] 关于「{query}」的搜索结果"
+
+
+# 复用同一个搜索客户端（单例）；SEARCH_PROVIDER=offline 时使用离线替身
+@lru_cache(maxsize=1)
+def get_search_provider():
+    if os.getenv("SEARCH_PROVIDER", "serpapi").lower() == "offline":
+        return OfflineSearch()
+    from langchain_community.utilities import SerpAPIWrapper
+    return SerpAPIWrapper()
+
+
+def normalize_query(query: str) -> str:
+    """全角/半角、大小写和多余空白不同的查询视为同一条"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+# 同一查询并发未命中时只放行一个上游请求；
+# 每个 key 对应 [锁, 持有或等待该锁的线程数]，最后一个线程离开时才移除，
+# 避免仍有线程在等待时锁被移除、新来的请求另建一把锁并发访问上游
+_inflight_locks = {}
+_inflight_guard = threading.Lock()
+
+
+def cached_search(query: str) -> str:
+    """带 TTL 的共享搜索缓存，TTL 与容量由 settings.CACHES['search'] 配置"""
+    cache = caches["search"]
+    key = "search:" + hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    with _inflight_guard:
+        entry = _inflight_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            result = cache.get(key)
+            if result is None:
+                result = get_search_provider().run(query)
+                cache.set(key, result)
+            return result
+    finally:
+        with _inflight_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _inflight_locks.pop(key, None)
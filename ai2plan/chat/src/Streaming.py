@@ -0,0 +1,123 @@
+"""
+流式对话的 agent 回调：把运行过程转成事件放入队列，并在客户端断开后中断执行
+
+依赖 LangChain，只在流式对话请求中导入
+"""
+import queue
+import reprlib
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class StreamCancelled(Exception):
+    """客户端已断开，终止后台的 agent 执行"""
+
+
+# 各事件级别会推送的事件类型；token/error/done 总是推送
+EVENT_LEVELS = {
+    "tokens": {"token", "error", "done"},
+    "tools": {"token", "error", "done", "tool_start", "tool_end"},
+    "all": {"token", "error", "done", "tool_start", "tool_end", "chain_start", "chain_end"},
+}
+PREVIEW_LIMIT = 200
+
+_preview_repr = reprlib.Repr()
+_preview_repr.maxstring = PREVIEW_LIMIT
+_preview_repr.maxother = PREVIEW_LIMIT // 4
+_preview_repr.maxlevel = 3
+
+
+def _preview(obj):
+    """截断后的载荷预览，不对完整输入/输出做 JSON 往返"""
+    if isinstance(obj, (int, float, bool)) or obj is None:
+        return obj
+    text = obj if isinstance(obj, str) else _preview_repr.repr(obj)
+    return text if len(text) <= PREVIEW_LIMIT else f"{text[:PREVIEW_LIMIT]}..."
+
+
+class StreamCallback(BaseCallbackHandler):
+    """把 agent 运行过程转成 (事件类型, 载荷) 放入队列，由视图按输出格式编码"""
+
+    # 让回调中抛出的 StreamCancelled 传播出去，中断 LLM 流与 agent 循环
+    raise_error = True
+
+    def __init__(self, q: queue.Queue, cancel_event: threading.Event = None,
+                 stall_timeout: float = 30.0, level: str = "tools"):
+        self.q = q
+        self.cancel_event = cancel_event or threading.Event()
+        self.stall_timeout = stall_timeout
+        self.events = EVENT_LEVELS.get(level, EVENT_LEVELS["tools"])
+        self.token_count = 0
+
+    # ============ 取消检查 ============
+    def _check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise StreamCancelled("客户端已断开")
+
+    def on_llm_start(self, *args, **kwargs):
+        # 在发起新的模型请求前检查，避免为已断开的客户端继续消耗 token
+        self._check_cancelled()
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self._check_cancelled()
+
+    # ============ Token 流 ============
+    def on_llm_new_token(self, token, **kwargs):
+        self._check_cancelled()
+        if token:
+            self.token_count += 1
+            self._put(("token", token))
+
+    def on_chain_error(self, error, parent_run_id=None, **kwargs):
+        # 错误会沿调用链逐层上抛，只在最外层报告一次；
+        # 模型调用都嵌套在 agent/对话链中，模型请求失败也由这里报告
+        if parent_run_id is None and not isinstance(error, StreamCancelled):
+            self._event("error", lambda: {"message": str(error)})
+
+    def on_llm_error(self, error, parent_run_id=None, **kwargs):
+        # 直接以模型作为最外层调用（不经过链）时，由这里报告
+        self.on_chain_error(error, parent_run_id=parent_run_id, **kwargs)
+
+    # ============ 进度事件 ============
+    def on_chain_start(self, serialized, inputs, **kwargs):
+        self._check_cancelled()
+        self._event("chain_start", lambda: {
+            "name": (serialized or {}).get("name") or kwargs.get("name") or "chain",
+            "inputs": _preview(inputs),
+        })
+
+    def on_chain_end(self, outputs, **kwargs):
+        self._event("chain_end", lambda: {"outputs": _preview(outputs)})
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        # 工具（搜索/知识库）本身也会调用外部服务，断开后不再执行
+        self._check_cancelled()
+        self._event("tool_start", lambda: {
+            "name": (serialized or {}).get("name") or "tool",
+            "input": _preview(input_str),
+        })
+
+    def on_tool_end(self, output, **kwargs):
+        # 避免把大段文档原文直接塞进事件，只传截断预览与长度
+        self._event("tool_end", lambda: {"output": _preview(output), "length": len(str(output))})
+
+    # ============ 帮助方法 ============
+    def _put(self, item):
+        """带取消检查的入队：队列长时间写满说明没人消费，视为客户端已断开"""
+        stalled_since = None
+        while not self.cancel_event.is_set():
+            try:
+                self.q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                stalled_since = stalled_since or time.time()
+                if time.time() - stalled_since > self.stall_timeout:
+                    self.cancel_event.set()
+        self._check_cancelled()
+
+    def _event(self, etype: str, build_payload):
+        # 客户端没有订阅的事件不构建载荷
+        if etype in self.events:
+            self._put((etype, build_payload()))
@@ -4,17 +4,17 @@ import time
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from langchain.agents import tool
-from langchain_community.utilities import SerpAPIWrapper
 from langchain_deepseek import ChatDeepSeek
 from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains.history_aware_retriever import create_history_aware_retriever
 
 from .Memory import MemoryClass
+from .Embedding import get_shared_embeddings
+from .VectorStore import get_vector_client
+from .Search import cached_search
 from langchain_core.output_parsers import PydanticOutputParser
 import contextvars
 from django.utils import timezone
@@ -24,6 +24,8 @@ from decimal import Decimal, InvalidOperation
 # === 会话与用户上下文 ===
 CURRENT_SESSION_ID = contextvars.ContextVar("CURRENT_SESSION_ID", default="")
 CURRENT_USER_ID = contextvars.ContextVar("CURRENT_USER_ID", default=None)
+# 视图认证时已得到的用户对象，工具直接复用，不再按 id 查库
+CURRENT_USER = contextvars.ContextVar("CURRENT_USER", default=None)
 
 def set_current_session_id(value:Optional[str])->None:
     CURRENT_SESSION_ID.set(value)
@@ -31,12 +33,26 @@ def set_current_session_id(value:Optional[str])->None:
 def set_current_user_id(value)->None:
     CURRENT_USER_ID.set(value)
 
+def set_current_user(user)->None:
+    CURRENT_USER.set(user)
+
 # === 业务模型 ===
 from users.models import User
 from todo.models import Todo
-from accounting.models import Account, Category, Transaction
+from accounting.models import Account, Category, Transaction, MonthlyRollup
+from django.db import transaction as db_transaction
 from datetime import datetime, timedelta
 
+def _get_current_user():
+    """当前对话的用户：优先复用视图传入的用户对象，只有 id 时才查库；无用户上下文返回 None"""
+    user_id = CURRENT_USER_ID.get()
+    if not user_id:
+        return None
+    user = CURRENT_USER.get()
+    if user is not None and str(user.pk) == str(user_id):
+        return user
+    return User.objects.get(userid=user_id)
+
 # === Pydantic 入参与输出模型 ===
 class CreateTodoInput(BaseModel):
     title: str = Field(..., description="待办标题，必须，简短精确")
@@ -88,8 +104,7 @@ class Config:
 @tool
 def search(query: str) -> str:
     """只有需要了解实时信息或不知道的事情的时候才会使用这个工具."""
-    serp = SerpAPIWrapper()
-    return serp.run(query)
+    return cached_search(query)
 
 @tool(parse_docstring=True)
 def get_info_from_local(query: str,session_id: Optional[str] = None) -> str:
@@ -113,13 +128,11 @@ def get_info_from_local(query: str,session_id: Optional[str] = None) -> str:
         ("human", "{input}"),
     ])
 
-    client = QdrantClient(path=os.getenv("PERSIST_DIR","./vector_store"))
+    client = get_vector_client()
     vector_store = QdrantVectorStore(
         client=client, 
         collection_name=os.getenv("EMBEDDING_COLLECTION"), 
-        embedding=HuggingFaceEmbeddings(
-            model=os.getenv("EMBEDDING_MODEL"),
-        )
+        embedding=get_shared_embeddings(),
     )
     retriever = vector_store.as_retriever(
         search_type="mmr",
@@ -147,14 +160,12 @@ def get_info_from_local(query: str,session_id: Optional[str] = None) -> str:
 def create_todo(title: str, description: Optional[str] = "", due_date: Optional[str] = None) -> str:
     """创建一个属于当前登录用户的待办事项。当用户表达待办需求时调用。"""
     try:
-        user_id = CURRENT_USER_ID.get()
-        if not user_id:
-            return json.dumps(ToolResult(success=False, message="未检测到用户上下文").model_dump(), ensure_ascii=False)
-
         try:
-            user = User.objects.get(userid=user_id)
+            user = _get_current_user()
         except User.DoesNotExist:
             return json.dumps(ToolResult(success=False, message="用户不存在").model_dump(), ensure_ascii=False)
+        if user is None:
+            return json.dumps(ToolResult(success=False, message="未检测到用户上下文").model_dump(), ensure_ascii=False)
 
         dt = None
         if due_date:
@@ -192,14 +203,12 @@ def create_todo(title: str, description: Optional[str] = "", due_date: Optional[
 @tool("create_transaction", args_schema=CreateTransactionInput)
 def create_transaction(date: str, amount: float, transaction_type: str, category_name: str, account_name: str, description: Optional[str] = "") -> str:
     """创建一条属于当前登录用户的记账记录。"""
-    user_id = CURRENT_USER_ID.get()
-    if not user_id:
-        return json.dumps(ToolResult(success=False, message="未检测到用户上下文").model_dump(), ensure_ascii=False)
-
     try:
-        user = User.objects.get(userid=user_id)
+        user = _get_current_user()
     except User.DoesNotExist:
         return json.dumps(ToolResult(success=False, message="用户不存在").model_dump(), ensure_ascii=False)
+    if user is None:
+        return json.dumps(ToolResult(success=False, message="未检测到用户上下文").model_dump(), ensure_ascii=False)
 
     try:
         tx_date = datetime.strptime(date, "%Y-%m-%d").date()
@@ -221,34 +230,36 @@ def create_transaction(date: str, amount: float, transaction_type: str, category
     cat_name = category_name.strip()[:100]
     acc_name = account_name.strip()[:100]
 
-    # 分类与账户（若不存在则创建）
-    category, _ = Category.objects.get_or_create(
-        user=user, name=cat_name,
-        defaults={"type": ttype, "description": ""}
-    )
-    account, _ = Account.objects.get_or_create(
-        user=user, name=acc_name,
-        defaults={"balance": Decimal("0"), "description": ""}
-    )
+    with db_transaction.atomic():
+        # 分类与账户（若不存在则创建）
+        category, _ = Category.objects.get_or_create(
+            user=user, name=cat_name,
+            defaults={"type": ttype, "description": ""}
+        )
+        account, _ = Account.objects.get_or_create(
+            user=user, name=acc_name,
+            defaults={"balance": Decimal("0"), "description": ""}
+        )
 
-    # 创建交易（金额用 Decimal）
-    tx = Transaction.objects.create(
-        user=user,
-        date=tx_date,
-        amount=amt_dec,
-        description=(description or "").strip(),
-        category=category,
-        account=account,
-        transaction_type=ttype
-    )
+        # 创建交易（金额用 Decimal）
+        tx = Transaction.objects.create(
+            user=user,
+            date=tx_date,
+            amount=amt_dec,
+            description=(description or "").strip(),
+            category=category,
+            account=account,
+            transaction_type=ttype
+        )
 
-    # 即时同步账户余额（全用 Decimal）
-    current_balance = account.balance or Decimal("0")
-    if ttype == "income":
-        account.balance = current_balance + amt_dec
-    else:
-        account.balance = current_balance - amt_dec
-    account.save(update_fields=["balance"])
+        # 即时同步账户余额（全用 Decimal）
+        current_balance = account.balance or Decimal("0")
+        if ttype == "income":
+            account.balance = current_balance + amt_dec
+        else:
+            account.balance = current_balance - amt_dec
+        account.save(update_fields=["balance"])
+        MonthlyRollup.apply(tx)
 
     return json.dumps(ToolResult(
         success=True,
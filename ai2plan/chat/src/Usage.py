@@ -0,0 +1,76 @@
+"""
+统计大模型调用的提示词 token 中命中服务端前缀缓存的部分
+
+DeepSeek 在 usage 中返回 prompt_cache_hit_tokens / prompt_cache_miss_tokens，
+OpenAI 兼容接口返回 prompt_tokens_details.cached_tokens（LangChain 映射为
+usage_metadata.input_token_details.cache_read），两种都支持。
+"""
+import logging
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger("chat.usage")
+
+# 进程内累计值，便于观察提示词调整后的缓存命中率
+PROMPT_CACHE_METRICS = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+_metrics_lock = threading.Lock()
+
+
+def prompt_token_usage(generation, llm_output=None):
+    """
+    单次模型调用的 (提示词 token 数, 其中命中缓存的 token 数)，没有 usage 时返回 None
+    """
+    message = getattr(generation, "message", None)
+    usage = getattr(message, "usage_metadata", None)
+    raw = (getattr(message, "response_metadata", None) or {}).get("token_usage") \
+        or (llm_output or {}).get("token_usage") or {}
+    if usage:
+        prompt = usage.get("input_tokens") or 0
+        cached = (usage.get("input_token_details") or {}).get("cache_read")
+    elif raw:
+        prompt = raw.get("prompt_tokens") or 0
+        cached = (raw.get("prompt_tokens_details") or {}).get("cached_tokens")
+    else:
+        return None
+    if cached is None:
+        cached = raw.get("prompt_cache_hit_tokens") or 0
+    return prompt, cached
+
+
+class UsageCallback(BaseCallbackHandler):
+    """累计一次对话（可能包含 agent 的多轮模型调用）的提示词 token 与缓存命中数"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = prompt_token_usage(generation, response.llm_output)
+                if usage is None:
+                    continue
+                self.calls += 1
+                self.prompt_tokens += usage[0]
+                self.cached_tokens += usage[1]
+                with _metrics_lock:
+                    PROMPT_CACHE_METRICS["calls"] += 1
+                    PROMPT_CACHE_METRICS["prompt_tokens"] += usage[0]
+                    PROMPT_CACHE_METRICS["cached_tokens"] += usage[1]
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_tokens,
+            "uncached_prompt_tokens": self.prompt_tokens - self.cached_tokens,
+        }
+
+
+def prompt_cache_metrics():
+    with _metrics_lock:
+        metrics = dict(PROMPT_CACHE_METRICS)
+    metrics["hit_rate"] = round(metrics["cached_tokens"] / metrics["prompt_tokens"], 3) if metrics["prompt_tokens"] else None
+    return metrics
@@ -0,0 +1,25 @@
+import atexit
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv as _load_dotenv
+_load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def _client_for(path: str):
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(path=path)
+    # 退出前主动关闭，释放目录锁
+    atexit.register(client.close)
+    return client
+
+
+def get_vector_client(path: str = None):
+    """进程内按存储目录共享 Qdrant 客户端
+
+    本地模式会锁住存储目录，同一进程重复打开会失败，且每次打开都要重新加载集合；
+    检索工具、文档入库与预热共用同一个客户端。
+    """
+    return _client_for(os.path.abspath(path or os.getenv("PERSIST_DIR", "./vector_store")))
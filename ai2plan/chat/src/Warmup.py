@@ -0,0 +1,152 @@
+"""
+AI 组件预热与就绪检查
+
+各组件的检查函数在本进程内完成加载（嵌入模型、向量库、提示词模板）或验证连通性
+（Redis、大模型接口），返回附加信息；抛出异常即视为该组件未就绪。
+模块本身只依赖标准库，重型依赖在检查函数内导入。
+"""
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from dotenv import load_dotenv as _load_dotenv
+_load_dotenv()
+
+# 就绪检查失败后，至少间隔多少秒才重新预热
+RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "30"))
+
+
+def _check_prompts():
+    # 导入 agent/工具链（LangChain 本身的加载开销最大），并构建一次提示词模板
+    from .Agents import AgentClass  # noqa: F401
+    from .Prompt import PromptClass
+
+    PromptClass(memorykey=os.getenv("MEMORY_KEY") or "chat_history").Prompt_Structure()
+    return {}
+
+
+def _check_embeddings():
+    from .Embedding import RemoteEmbeddings, get_shared_embeddings
+
+    embeddings = get_shared_embeddings()
+    if isinstance(embeddings, RemoteEmbeddings):
+        # 模型在共享向量化服务中加载，这里只确认服务可用
+        try:
+            return {"remote": embeddings.health()}
+        except ConnectionError:
+            if embeddings.fallback is None:
+                raise
+        # 服务不可用时预热本进程的回退模型
+        return {"fallback": True, "dimension": len(embeddings.embed_query("warmup"))}
+    return {"dimension": len(embeddings.embed_query("warmup"))}
+
+
+def _check_vector_store():
+    from .VectorStore import get_vector_client
+
+    names = [c.name for c in get_vector_client().get_collections().collections]
+    collection = os.getenv("EMBEDDING_COLLECTION")
+    return {"collection": collection, "collection_exists": collection in names}
+
+
+def _check_redis():
+    from .History import get_redis
+
+    # 预热共享连接池，后续读取历史消息直接复用
+    get_redis().ping()
+    return {}
+
+
+def _check_llm():
+    base = os.getenv("DEEPSEEK_API_BASE")
+    if not base:
+        raise RuntimeError("未配置 DEEPSEEK_API_BASE")
+    request = urllib.request.Request(
+        base.rstrip("/") + "/models",
+        headers={"Authorization": f"Bearer {os.getenv('DEEPSEEK_API_KEY', '')}"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            status = response.status
+    except urllib.error.HTTPError as e:
+        # 有 HTTP 响应说明地址可达；5xx 视为服务不可用
+        if e.code >= 500:
+            raise
+        status = e.code
+    return {"status": status}
+
+
+# 组件名 -> 检查函数，按依赖由轻到重排列
+COMPONENTS = {
+    "prompts": _check_prompts,
+    "embeddings": _check_embeddings,
+    "vector_store": _check_vector_store,
+    "redis": _check_redis,
+    "llm": _check_llm,
+}
+
+
+def selected_components(names=None):
+    """
+    names 或环境变量 WARMUP_COMPONENTS（逗号分隔）指定的组件，默认全部
+    """
+    if names is None:
+        env = os.getenv("WARMUP_COMPONENTS", "")
+        names = [n.strip() for n in env.split(",") if n.strip()] or list(COMPONENTS)
+    unknown = [n for n in names if n not in COMPONENTS]
+    if unknown:
+        raise ValueError(f"未知组件: {', '.join(unknown)}，可选: {', '.join(COMPONENTS)}")
+    return {name: COMPONENTS[name] for name in names}
+
+
+def warmup(components=None):
+    """
+    依次执行各组件的检查，返回 {组件名: {"ok", "seconds", "detail" | "error"}}
+    """
+    results = {}
+    for name, check in (components or selected_components()).items():
+        start = time.perf_counter()
+        try:
+            result = {"ok": True, "detail": check()}
+        except Exception as e:
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        results[name] = result
+    return results
+
+
+class Readiness:
+    """
+    本进程的就绪状态：首次检查时在后台线程预热，预热完成且全部组件正常后才算就绪
+    """
+
+    def __init__(self, components=None):
+        self._components = components
+        self._lock = threading.Lock()
+        self.state = "cold"  # cold / warming / ready / failed
+        self.results = {}
+        self.finished_at = None
+
+    def _run(self):
+        results = warmup(self._components or selected_components())
+        with self._lock:
+            self.results = results
+            self.finished_at = time.time()
+            self.state = "ready" if all(r["ok"] for r in results.values()) else "failed"
+
+    def ensure_started(self):
+        with self._lock:
+            retry = self.state == "failed" and time.time() - self.finished_at >= RETRY_SECONDS
+            if self.state != "cold" and not retry:
+                return
+            self.state = "warming"
+        threading.Thread(target=self._run, name="ai-warmup", daemon=True).start()
+
+    def snapshot(self):
+        with self._lock:
+            return {"status": self.state, "components": dict(self.results)}
+
+
+readiness = Readiness()
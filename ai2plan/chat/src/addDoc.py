@@ -8,6 +8,8 @@ _load_dotenv()
 
 
 from langchain_huggingface import HuggingFaceEmbeddings
+from .Embedding import get_shared_embeddings
+from .VectorStore import get_vector_client
 from langchain_community.document_loaders import WebBaseLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_qdrant import QdrantVectorStore
@@ -41,10 +43,13 @@ class DocumentProcessor:
                            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger("DocumentProcessor")
         
-        # 初始化嵌入模型
-        self.embeddings = HuggingFaceEmbeddings(
-            model=embedding_model
-            )
+        # 初始化嵌入模型：默认模型复用进程内共享实例（或共享向量化服务）
+        if embedding_model == os.getenv("EMBEDDING_MODEL"):
+            self.embeddings = get_shared_embeddings()
+        else:
+            self.embeddings = HuggingFaceEmbeddings(
+                model=embedding_model
+                )
         
         # 配置文本分割器
         self.splitter = RecursiveCharacterTextSplitter(
@@ -60,7 +65,8 @@ class DocumentProcessor:
         
         # 初始化Qdrant客户端和集合
         self.collection_name = collection_name
-        self.client = QdrantClient(path=self.storage_dir)
+        # 持久目录与检索工具共用同一个客户端；临时目录单独打开
+        self.client = QdrantClient(path=self.storage_dir) if self.is_temp_dir else get_vector_client(self.storage_dir)
         
         # 检查并创建集合
         self._ensure_collection_exists()
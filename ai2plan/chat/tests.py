@@ -1,3 +1,583 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import User
+from .models import History
+from .src.History import delete_sessions, get_redis, message_key, read_messages, replace_with_summary, sweep_sessions
+from .src.Limits import RunBudget
+from .src.Prompt import PromptClass
+from .src.Router import AGENT, CHAT, classify
+from .src.Search import OfflineSearch, cached_search
+from .src.Usage import prompt_token_usage
+from .src.Warmup import Readiness, warmup
+
+# 导入 URL 配置（即加载全部视图）的时间上限，CI 机器较慢时可用环境变量放宽
+IMPORT_BUDGET_SECONDS = float(os.getenv('IMPORT_BUDGET_SECONDS', '1.0'))
+# 只应在首次对话/入库时才加载的重型依赖
+AI_MODULES = ('langchain', 'langchain_core', 'langchain_qdrant', 'qdrant_client', 'torch', 'sentence_transformers')
+
+_PROBE = '''
+import json, os, sys, time
+os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings'
+start = time.perf_counter()
+import django
+django.setup()
+import config.urls
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'loaded': [m for m in %r if m in sys.modules],
+}))
+''' % (AI_MODULES,)
+
+
+class ImportBudgetTests(SimpleTestCase):
+    def test_urls_import_without_ai_stack_within_budget(self):
+        # 在新进程中测量，避免受当前测试进程已导入模块的影响
+        result = subprocess.run(
+            [sys.executable, '-c', _PROBE],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(probe['loaded'], [])
+        self.assertLess(probe['seconds'], IMPORT_BUDGET_SECONDS)
+
+
+def _ok():
+    return {'loaded': True}
+
+
+def _broken():
+    raise ConnectionError('refused')
+
+
+class WarmupTests(SimpleTestCase):
+    def test_warmup_reports_each_component(self):
+        results = warmup({'ok': _ok, 'broken': _broken})
+        self.assertEqual(results['ok']['detail'], {'loaded': True})
+        self.assertFalse(results['broken']['ok'])
+        self.assertIn('ConnectionError', results['broken']['error'])
+        self.assertIn('seconds', results['broken'])
+
+    def test_readiness_becomes_ready_after_background_warmup(self):
+        readiness = Readiness({'ok': _ok})
+        self.assertEqual(readiness.snapshot()['status'], 'cold')
+        readiness.ensure_started()
+        for _ in range(100):
+            if readiness.snapshot()['status'] != 'warming':
+                break
+            time.sleep(0.01)
+        self.assertEqual(readiness.snapshot()['status'], 'ready')
+
+    def test_failed_component_keeps_worker_unready(self):
+        readiness = Readiness({'ok': _ok, 'broken': _broken})
+        readiness._run()
+        self.assertEqual(readiness.snapshot()['status'], 'failed')
+
+
+class RouterTests(SimpleTestCase):
+    def test_small_talk_goes_to_chat(self):
+        for message in ('你好', '谢谢！', '好的~', 'thanks', '晚安', '你是谁？'):
+            self.assertEqual(classify(message), CHAT, message)
+
+    def test_tool_intents_and_unknown_go_to_agent(self):
+        for message in ('提醒我明天开会', '今天花了30元', '比特币价格', '介绍下langchain', '帮我写一首诗', ''):
+            self.assertEqual(classify(message), AGENT, message)
+
+    def test_reply_to_clarifying_question_goes_to_agent(self):
+        self.assertEqual(classify('好的', last_reply=lambda: '要我帮你创建这个待办吗？'), AGENT)
+        self.assertEqual(classify('好的', last_reply=lambda: '不客气。'), CHAT)
+
+
+class PromptCacheTests(SimpleTestCase):
+    def test_volatile_parts_come_after_stable_prefix(self):
+        calm = PromptClass(feeling={'feeling': 'default', 'score': 2}).Prompt_Structure()
+        angry = PromptClass(feeling={'feeling': 'angry', 'score': 9}).Prompt_Structure()
+        history = [('user', '你好'), ('ai', '你好呀')]
+        a = calm.format_messages(input='q', chat_history=history, agent_scratchpad=[])
+        b = angry.format_messages(input='q', chat_history=history, agent_scratchpad=[])
+        # 固定前缀与对话记录完全一致，差异只出现在其后的本轮上下文
+        self.assertEqual([m.content for m in a[:3]], [m.content for m in b[:3]])
+        self.assertNotEqual(a[3].content, b[3].content)
+
+    def test_cached_tokens_from_deepseek_and_openai_usage(self):
+        from langchain_core.messages import AIMessage
+        from langchain_core.outputs import ChatGeneration
+
+        deepseek = ChatGeneration(message=AIMessage('', response_metadata={'token_usage': {
+            'prompt_tokens': 100, 'prompt_cache_hit_tokens': 64, 'prompt_cache_miss_tokens': 36}}))
+        openai = ChatGeneration(message=AIMessage('', usage_metadata={
+            'input_tokens': 100, 'output_tokens': 5, 'total_tokens': 105, 'input_token_details': {'cache_read': 80}}))
+        self.assertEqual(prompt_token_usage(deepseek), (100, 64))
+        self.assertEqual(prompt_token_usage(openai), (100, 80))
+
+
+class RunBudgetTests(SimpleTestCase):
+    def _tool(self, name, delay=0):
+        from langchain_core.tools import StructuredTool
+
+        def run(query: str) -> str:
+            time.sleep(delay)
+            return f'result {query}'
+        return StructuredTool.from_function(run, name=name, description=name)
+
+    def test_calls_over_budget_return_hint_instead_of_running(self):
+        budget = RunBudget(tool_budget=2)
+        tool = budget.wrap(self._tool('create_todo'))
+        outputs = [tool.invoke({'query': str(i)}) for i in range(3)]
+        self.assertEqual(outputs[:2], ['result 0', 'result 1'])
+        self.assertIn('上限', outputs[2])
+        self.assertEqual(budget.triggered, ['tool_budget'])
+
+    def test_slow_network_tool_times_out(self):
+        budget = RunBudget(tool_timeout=0.05)
+        start = time.monotonic()
+        output = budget.wrap(self._tool('search', delay=0.5)).invoke({'query': 'q'})
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertIn('没有返回结果', output)
+        self.assertEqual(budget.triggered, ['tool_timeout'])
+
+    def test_saturated_tool_threads_are_counted(self):
+        import threading
+        from unittest import mock
+
+        from .src import Limits
+
+        with mock.patch.object(Limits, '_tool_slots', threading.BoundedSemaphore(1)):
+            saturated = Limits.LIMIT_METRICS['tool_saturated']
+            slow = threading.Thread(target=RunBudget().wrap(self._tool('search', delay=0.3)).invoke,
+                                    args=({'query': 'slow'},))
+            slow.start()
+            time.sleep(0.05)
+            # 唯一的线程被占用：排队等不到空位按超时处理，并单独计入 tool_saturated
+            budget = RunBudget(tool_timeout=0.05)
+            output = budget.wrap(self._tool('search')).invoke({'query': 'q'})
+            self.assertIn('繁忙', output)
+            self.assertEqual(budget.triggered, ['tool_timeout'])
+            self.assertEqual(Limits.LIMIT_METRICS['tool_saturated'], saturated + 1)
+            # 名额释放后可以正常调用
+            slow.join()
+            self.assertEqual(RunBudget().wrap(self._tool('search')).invoke({'query': 'q'}), 'result q')
+
+
+def parse_sse(text):
+    """按 SSE 规范解析事件流：空行分隔事件，多个 data 行以换行拼接"""
+    events, current = [], {}
+    for line in text.split('\n'):
+        if not line:
+            if current:
+                events.append(current)
+            current = {}
+            continue
+        field, _, value = line.partition(':')
+        value = value[1:] if value.startswith(' ') else value
+        if field == 'data':
+            current['data'] = current['data'] + '\n' + value if 'data' in current else value
+        elif field in ('id', 'event'):
+            current[field] = value
+    return events
+
+
+class StreamingEncodingTests(SimpleTestCase):
+    def test_sse_event_fields_and_multiline_payload(self):
+        from .views import _encode_sse
+
+        text = '第一行\n第二行\r\n第三行\u2028同一行'
+        chunk = _encode_sse('token', {'text': text}, event_id=7) + _encode_sse('done', {'tokens': 1})
+        events = parse_sse(chunk)
+        self.assertEqual([(e.get('id'), e['event']) for e in events], [('7', 'token'), (None, 'done')])
+        # 换行在 JSON 中被转义，每个事件只有一行 data，且能原样还原
+        self.assertEqual(chunk.split('\n\n')[0].count('data:'), 1)
+        self.assertEqual(json.loads(events[0]['data']), {'text': text})
+
+    def test_event_levels_filter_progress_events(self):
+        import queue
+
+        from .src.Streaming import EVENT_LEVELS, StreamCallback
+
+        def emitted(level):
+            built = []
+            cb = StreamCallback(queue.Queue(), level=level)
+            cb.on_tool_start({'name': 'search'}, 'q')
+            cb.on_chain_start({'name': 'agent'}, {'input': 'q'})
+            cb._event('tool_end', lambda: built.append('tool_end') or {})
+            cb.on_llm_new_token('hi')
+            return [item[0] for item in list(cb.q.queue)], built
+
+        self.assertEqual(emitted('tokens'), (['token'], []))
+        self.assertEqual(emitted('tools'), (['tool_start', 'tool_end', 'token'], ['tool_end']))
+        self.assertEqual(emitted('all')[0], ['tool_start', 'chain_start', 'tool_end', 'token'])
+        # 未知级别按默认的 tools 处理
+        self.assertEqual(emitted('verbose'), emitted('tools'))
+        self.assertTrue({'token', 'error', 'done'} <= EVENT_LEVELS['tokens'])
+
+    def test_errors_reported_once_from_the_root_run(self):
+        import queue
+        import uuid as _uuid
+
+        from .src.Streaming import StreamCallback, StreamCancelled
+
+        cb = StreamCallback(queue.Queue(), level='tokens')
+        cb.on_llm_error(ValueError('inner'), parent_run_id=_uuid.uuid4())
+        cb.on_chain_error(ValueError('inner'), parent_run_id=_uuid.uuid4())
+        cb.on_chain_error(ValueError('boom'), parent_run_id=None)
+        cb.on_llm_error(ValueError('bare llm'), parent_run_id=None)
+        cb.on_chain_error(StreamCancelled('gone'), parent_run_id=None)
+        self.assertEqual(list(cb.q.queue), [('error', {'message': 'boom'}), ('error', {'message': 'bare llm'})])
+
+    def test_preview_truncates_large_payloads(self):
+        from .src.Streaming import PREVIEW_LIMIT, _preview
+
+        self.assertEqual(_preview('short'), 'short')
+        self.assertEqual(_preview('x' * 1000), 'x' * PREVIEW_LIMIT + '...')
+        for value in (3, 2.5, True, None):
+            self.assertIs(_preview(value), value)
+        nested = {'docs': [{'page_content': 'y' * 5000}] * 50, 'meta': {'a': {'b': {'c': {'d': 1}}}}}
+        preview = _preview(nested)
+        self.assertLessEqual(len(preview), PREVIEW_LIMIT + 3)
+        self.assertTrue(preview.startswith("{'docs'"))
+
+
+class SlowOfflineSearch(OfflineSearch):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def run(self, query):
+        time.sleep(self.delay)
+        return super().run(query)
+
+
+@override_settings(CACHES={'search': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                      'LOCATION': 'search-tests', 'TIMEOUT': 1}})
+class SearchCacheTests(SimpleTestCase):
+    def _provider(self, delay=0.0):
+        from unittest import mock
+
+        provider = SlowOfflineSearch(delay)
+        patcher = mock.patch('chat.src.Search.get_search_provider', return_value=provider)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return provider
+
+    def test_hit_within_ttl_and_miss_after_expiry(self):
+        provider = self._provider()
+        first = cached_search('langchain 向量库')
+        self.assertEqual(cached_search('langchain 向量库'), first)
+        self.assertEqual(provider.calls, 1)
+        time.sleep(1.1)
+        cached_search('langchain 向量库')
+        self.assertEqual(provider.calls, 2)
+
+    def test_equivalent_queries_share_one_key(self):
+        provider = self._provider()
+        cached_search('Bitcoin  Price')
+        # 大小写、全角字符与多余空白不同视为同一查询
+        for query in ('bitcoin price', ' BITCOIN price ', 'Ｂｉｔｃｏｉｎ　ｐｒｉｃｅ'):
+            cached_search(query)
+        self.assertEqual(provider.calls, 1)
+        cached_search('bitcoin prices')
+        self.assertEqual(provider.calls, 2)
+
+    def test_concurrent_misses_make_one_provider_call(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from .src import Search
+
+        provider = self._provider(delay=0.1)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(cached_search, ['天气'] * 8))
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(Search._inflight_locks, {})
+
+
+class RecordingEmbeddings:
+    """确定性的假嵌入模型：记录每次 embed_documents 收到的批次，可模拟推理耗时"""
+
+    def __init__(self, delay=0.0):
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        self.model = DeterministicFakeEmbedding(size=8)
+        self.delay = delay
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
+class BatchingEmbeddingsTests(SimpleTestCase):
+    def test_concurrent_queries_share_one_batch(self):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        from .src.Embedding import BatchingEmbeddings
+
+        model = RecordingEmbeddings()
+        batching = BatchingEmbeddings(model, max_batch_size=32, max_wait_ms=200)
+        texts = [f'q{i}' for i in range(8)] + ['q0']
+        barrier = threading.Barrier(len(texts))
+
+        def query(text):
+            barrier.wait()
+            return batching.embed_query(text)
+
+        with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+            vectors = list(pool.map(query, texts))
+        # 一次 embed_documents 完成全部查询，重复的查询只推理一次
+        self.assertEqual(len(model.batches), 1)
+        self.assertCountEqual(model.batches[0], set(texts))
+        for text, vector in zip(texts, vectors):
+            self.assertEqual(vector, model.embed_query(text))
+        self.assertEqual(batching.stats, {'queries': 9, 'batches': 1, 'max_batch': 9})
+
+
+class EmbeddingServerTests(SimpleTestCase):
+    def _serve(self, delay=0.0):
+        import tempfile
+        import threading
+
+        from .src.Embedding import BatchingEmbeddings, EmbeddingServer
+
+        model = RecordingEmbeddings(delay)
+        path = os.path.join(tempfile.mkdtemp(), 'embedding.sock')
+        server = EmbeddingServer(path, BatchingEmbeddings(model, max_wait_ms=1), model_name='fake')
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, model
+
+    def test_vectors_round_trip_over_socket(self):
+        from .src.Embedding import RemoteEmbeddings
+
+        server, model = self._serve()
+        client = RemoteEmbeddings(server.socket_path, timeout=5)
+        self.assertEqual(client.embed_query('你好'), model.embed_query('你好'))
+        self.assertEqual(client.embed_documents(['a', 'b']), model.embed_documents(['a', 'b']))
+        self.assertEqual(client.health()['model'], 'fake')
+
+    def test_missing_socket_falls_back_to_local_model(self):
+        import tempfile
+
+        from .src.Embedding import RemoteEmbeddings
+
+        path = os.path.join(tempfile.mkdtemp(), 'missing.sock')
+        local = RecordingEmbeddings()
+        client = RemoteEmbeddings(path, timeout=1, fallback=lambda: local)
+        self.assertEqual(client.embed_query('q'), local.embed_query('q'))
+        self.assertEqual(client.embed_documents(['d']), local.embed_documents(['d']))
+        with self.assertRaises(ConnectionError):
+            RemoteEmbeddings(path, timeout=1).embed_query('q')
+
+    def test_timeout_is_not_retried(self):
+        from .src.Embedding import RemoteEmbeddings
+
+        server, model = self._serve(delay=0.5)
+        client = RemoteEmbeddings(server.socket_path, timeout=0.1, fallback=RecordingEmbeddings)
+        with self.assertRaises(TimeoutError):
+            client.embed_documents(['slow'])
+        time.sleep(0.5)
+        # 只发出了一次请求，也没有回退到本地模型
+        self.assertEqual(model.batches, [['slow']])
+        self.assertIsNone(client._fallback_embeddings)
+
+
+def _streaming_agent(text, delay=0.0):
+    """
+    绕过 __init__ 构造 AgentClass：agent 执行器换成逐 token 流式输出的假模型，
+    不依赖模型服务与 Redis，run_agent 的路由、回调与异常处理保持原样
+    """
+    from types import SimpleNamespace
+
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+    from .src.Agents import AgentClass
+
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=text)]))
+
+    def run(inputs, config):
+        chunks = []
+        for chunk in model.stream(inputs['input'], config=config):
+            chunks.append(chunk.content)
+            time.sleep(delay)
+        return {'output': ''.join(chunks)}
+
+    agent = AgentClass.__new__(AgentClass)
+    agent.session_id = 'test'
+    agent.feeling = {'feeling': 'default', 'score': 5}
+    agent.emotion = SimpleNamespace(Emotion_Sensing=lambda text: None)
+    agent._last_reply = lambda: ''
+    agent.agent_executor = RunnableLambda(run)
+    return agent
+
+
+class StreamCancelTests(TestCase):
+    MESSAGE = '帮我查一下明天的天气'
+    TEXT = ' '.join(f'w{i}' for i in range(40))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='streamer', password='pw')
+        History.objects.create(user=cls.user, session_id='s')
+
+    def test_run_agent_propagates_cancellation(self):
+        import queue
+        import threading
+
+        from langchain_core.callbacks import BaseCallbackHandler
+        from .src.Streaming import StreamCallback, StreamCancelled
+
+        cancel_event = threading.Event()
+        cb = StreamCallback(queue.Queue(), cancel_event)
+
+        class CancelAfter(BaseCallbackHandler):
+            def on_llm_new_token(self, token, **kwargs):
+                if cb.token_count >= 3:
+                    cancel_event.set()
+
+        with self.assertRaises(StreamCancelled):
+            _streaming_agent(self.TEXT).run_agent(self.MESSAGE, callbacks=[cb, CancelAfter()],
+                                                  cancel_event=cancel_event)
+        self.assertEqual(cb.token_count, 3)
+
+    def test_sse_stream_numbers_events(self):
+        from unittest import mock
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('chat.src.Agents.AgentClass', return_value=_streaming_agent('你好 世界')):
+            response = client.post('/api/chat/stream/?format=sse', {'message': self.MESSAGE, 'session_id': 's'},
+                                   format='json')
+            body = b''.join(response.streaming_content).decode()
+        self.assertTrue(response['Content-Type'].startswith('text/event-stream'))
+        events = parse_sse(body)
+        self.assertEqual([e['id'] for e in events], [str(i) for i in range(1, len(events) + 1)])
+        self.assertEqual(events[-1]['event'], 'done')
+        text = ''.join(json.loads(e['data'])['text'] for e in events if e['event'] == 'token')
+        self.assertEqual(text, '你好 世界')
+
+    def test_disconnect_stops_generation_and_records_metrics(self):
+        from unittest import mock
+
+        from . import views
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        before = dict(views.STREAM_METRICS)
+        agent = _streaming_agent(self.TEXT, delay=0.02)
+        with mock.patch('chat.src.Agents.AgentClass', return_value=agent):
+            response = client.post('/api/chat/stream/', {'message': self.MESSAGE, 'session_id': 's'}, format='json')
+            chunks = iter(response.streaming_content)
+            received = ''
+            while 'w0' not in received:
+                received += next(chunks).decode()
+            # 客户端断开：WSGI 服务器关闭响应，生成器的 finally 通知后台线程停止
+            response.close()
+            deadline = time.monotonic() + 5
+            while views.STREAM_METRICS['cancelled'] == before['cancelled'] and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(views.STREAM_METRICS['cancelled'], before['cancelled'] + 1)
+        self.assertEqual(views.STREAM_METRICS['completed'], before['completed'])
+        tokens = views.STREAM_METRICS['cancelled_tokens'] - before['cancelled_tokens']
+        self.assertGreater(tokens, 0)
+        # 文本共 79 个 token（词与空格），断开后不再继续生成
+        self.assertLess(tokens, 40)
+
+
+def _redis_available():
+    try:
+        return get_redis().ping()
+    except Exception:
+        return False
+
+
+@skipUnless(_redis_available(), '需要可连接的 Redis（REDIS_URL）')
+class HistoryReadTests(SimpleTestCase):
+    def setUp(self):
+        self.session_id = f'test-{uuid.uuid4().hex}'
+        self.key = message_key(self.session_id)
+        for i in range(5):
+            get_redis().lpush(self.key, json.dumps({'type': 'human', 'data': {'content': f'm{i}'}}))
+        self.addCleanup(get_redis().delete, self.key)
+
+    def test_pages_newest_first_with_stable_cursor(self):
+        page, cursor = read_messages(self.session_id, limit=2)
+        self.assertEqual([m['content'] for m in page], ['m4', 'm3'])
+        # 翻页期间写入的新消息不影响游标
+        get_redis().lpush(self.key, json.dumps({'type': 'ai', 'data': {'content': 'new'}}))
+        page, cursor = read_messages(self.session_id, before=cursor, limit=2)
+        self.assertEqual([m['content'] for m in page], ['m2', 'm1'])
+        page, cursor = read_messages(self.session_id, before=cursor, limit=2)
+        self.assertEqual(([m['content'] for m in page], cursor), (['m0'], None))
+
+    def test_summary_keeps_seq_increasing(self):
+        from langchain_core.messages import AIMessage
+
+        page, cursor = read_messages(self.session_id, limit=2)
+        replace_with_summary(self.session_id, AIMessage(content='summary'), ttl=0)
+        get_redis().lpush(self.key, json.dumps({'type': 'human', 'data': {'content': 'after'}}))
+        page, _ = read_messages(self.session_id)
+        self.assertEqual([(m['seq'], m['content']) for m in page], [(6, 'after'), (5, 'summary')])
+        # 总结之前的游标指向已被总结掉的消息，返回空页而不是错位的数据
+        self.assertEqual(read_messages(self.session_id, before=cursor), ([], None))
+        # 超出最新 seq 的游标按从最新一条开始
+        self.assertEqual([m['seq'] for m in read_messages(self.session_id, before=100)[0]], [6, 5])
+
+
+@skipUnless(_redis_available(), '需要可连接的 Redis（REDIS_URL）')
+class SessionCleanupTests(SimpleTestCase):
+    def setUp(self):
+        self.ids = [f'test-{uuid.uuid4().hex}' for _ in range(5)]
+        for sid in self.ids:
+            get_redis().lpush(message_key(sid), '{}')
+        self.addCleanup(get_redis().delete, *map(message_key, self.ids))
+
+    def test_delete_sessions_in_batches(self):
+        self.assertEqual(delete_sessions(self.ids[:3] + ['missing'], batch_size=2), 3)
+        self.assertEqual(get_redis().exists(*map(message_key, self.ids)), 2)
+
+    def test_sweep_removes_orphans_and_sets_ttl(self):
+        alive = set(self.ids[:2])
+        # 只处理本测试写入的 key，其他会话一律视为存在且不改动
+        stats = sweep_sessions(lambda ids: {i for i in ids if i in alive or i not in self.ids}, batch_size=2, ttl=0)
+        self.assertGreaterEqual(stats['deleted'], 3)
+        self.assertEqual(get_redis().exists(*map(message_key, self.ids)), 2)
+        self.assertEqual(get_redis().ttl(message_key(self.ids[0])), -1)
+
+
+class HistoryDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='owner', password='pw')
+        cls.other = User.objects.create_user(username='other', password='pw')
+        cls.mine = [History.objects.create(user=cls.user, session_id=f's{i}') for i in range(3)]
+        cls.foreign = History.objects.create(user=cls.other, session_id='x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_retrieve_rejects_non_integer_limit(self):
+        resp = self.client.get(f'/api/histories/{self.mine[0].pk}/', {'limit': 'abc'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_bulk_delete_is_scoped_to_user(self):
+        ids = [h.pk for h in self.mine[:2]] + [self.foreign.pk]
+        # Redis 清理在事务提交后执行，这里不运行提交回调，因此不依赖 Redis
+        resp = self.client.post('/api/histories/bulk/delete/', {'ids': ids}, format='json')
+        self.assertEqual(resp.json(), {'affected': 2})
+        self.assertEqual(set(History.objects.values_list('session_id', flat=True)), {'s2', 'x'})
@@ -1,23 +1,37 @@
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from .src.Agents import AgentClass
 from .src.Storage import add_user, get_user
-from .src.Memory import MemoryClass
 from .models import History
-from .serializers import ChatSerializer,HistorySerializer
+from .serializers import ChatSerializer,HistoryBulkDeleteSerializer,HistorySerializer
 from rest_framework import permissions
 from rest_framework import status
-from .src.addDoc import DocumentProcessor
+from rest_framework.decorators import action
+from django.db import transaction
 import os
 from django.http import StreamingHttpResponse
 from rest_framework.permissions import IsAuthenticated
-from langchain_core.callbacks import BaseCallbackHandler
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 import queue
+import logging
 import threading
+import itertools
 import json
 import time
 
+cleanup_logger = logging.getLogger("chat.cleanup")
+
+
+def _delete_session_messages(session_ids):
+    """删除会话在 Redis 中的消息；失败只记录日志，残留的 key 由 cleanup_sessions 命令清理"""
+    from .src.History import delete_sessions
+
+    try:
+        delete_sessions(session_ids)
+    except Exception as e:
+        cleanup_logger.warning(f"删除 {len(session_ids)} 个会话的消息失败: {e}")
+
+
 # Create your views here.
 class HistoryViewSet(ModelViewSet):
     queryset = History.objects.all()
@@ -34,15 +48,64 @@ class HistoryViewSet(ModelViewSet):
             return Response(self.serializer_class(instance).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def perform_destroy(self, instance):
+        session_id = instance.session_id
+        instance.delete()
+        # 数据库提交后再删 Redis，避免回滚后会话仍在而消息已丢
+        transaction.on_commit(lambda: _delete_session_messages([session_id]))
+
+    @action(detail=False, methods=['post'], url_path='bulk/delete')
+    def bulk_delete(self, request):
+        serializer = HistoryBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = self.get_queryset().filter(pk__in=serializer.validated_data['ids'])
+        with transaction.atomic():
+            session_ids = list(queryset.select_for_update().values_list('session_id', flat=True))
+            affected, _ = History.objects.filter(session_id__in=session_ids).delete()
+            transaction.on_commit(lambda: _delete_session_messages(session_ids))
+        return Response({'affected': affected})
+
     def retrieve(self, request, *args, **kwargs):
+        """
+        会话详情附带最近一页消息（按时间正序），只读 Redis，不触发总结；
+        更早的消息通过 messages 接口以 memory_next 为游标继续加载
+        """
+        from .src.History import read_messages
+
         instance = self.get_object()
-        base_data = self.serializer_class(instance).data
-        memory = MemoryClass(memorykey=instance.session_id)
-        chat_history = memory.get_memory(session_id=instance.session_id)
-        resp = dict(base_data)
-        resp['memory'] = chat_history.messages
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({'error': 'limit 必须为整数'}, status=status.HTTP_400_BAD_REQUEST)
+        resp = dict(self.serializer_class(instance).data)
+        try:
+            messages, next_cursor = read_messages(instance.session_id, limit=limit)
+        except Exception as e:
+            return Response({'error': f'读取历史消息失败: {e}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        resp['memory'] = messages[::-1]
+        resp['memory_next'] = next_cursor
         return Response(resp)
 
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        """
+        ?before=<seq>&limit=50 按新到旧分页读取消息，next 为下一页的 before
+        """
+        from .src.History import read_messages
+
+        instance = self.get_object()
+        try:
+            before = request.query_params.get('before')
+            before = int(before) if before not in (None, '') else None
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({'error': 'before/limit 必须为整数'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results, next_cursor = read_messages(instance.session_id, before=before, limit=limit)
+        except Exception as e:
+            return Response({'error': f'读取历史消息失败: {e}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({'results': results, 'next': next_cursor})
+
 class ChatView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ChatSerializer
@@ -56,7 +119,10 @@ class ChatView(APIView):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        agent = AgentClass(user_id,session_id)
+        # AI 相关模块在首次对话时才导入，非对话接口与管理命令不承担其加载开销
+        from .src.Agents import AgentClass
+
+        agent = AgentClass(user_id,session_id,user=request.user)
         try:
             response = agent.run_agent(message)
             
@@ -68,6 +134,8 @@ class ChatView(APIView):
             
             return Response({
                 'response': ai_response,
+                'usage': response.get('usage') if isinstance(response, dict) else None,
+                'limits': response.get('limits', []) if isinstance(response, dict) else [],
                 'success': True
             }, status=status.HTTP_200_OK)
         except Exception as e:
@@ -81,123 +149,194 @@ class AddDocView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request, *args, **kwargs):
+        from .src.addDoc import DocumentProcessor
+
         urls = request.data.get('urls', [])
         document_processor = DocumentProcessor(persist_directory=os.getenv("PERSIST_DIR"))
         result = document_processor.add_urls(urls)
         return Response(result, status=status.HTTP_200_OK)
 
-class StreamCallback(BaseCallbackHandler):
-    def __init__(self, q: queue.Queue):
-        self.q = q
+# 流式对话的运行计数，便于观察被放弃的请求浪费了多少工作
+STREAM_METRICS = {"started": 0, "completed": 0, "cancelled": 0, "cancelled_tokens": 0, "cancelled_seconds": 0.0}
+_metrics_lock = threading.Lock()
+logger = logging.getLogger("chat.stream")
 
-    # ============ Token 流 ============
-    def on_llm_new_token(self, token, **kwargs):
-        if token:
-            self.q.put(token)
 
-    def on_llm_end(self, *args, **kwargs):
-        self.q.put(None)
+def _record_stream(**deltas):
+    with _metrics_lock:
+        for key, value in deltas.items():
+            STREAM_METRICS[key] += value
+        return dict(STREAM_METRICS)
 
-    def on_llm_error(self, error, **kwargs):
-        self._event("error", {"message": str(error)})
-        self.q.put(f"[ERROR]{str(error)}")
-        self.q.put(None)
 
-    def on_chain_error(self, error, **kwargs):
-        self._event("error", {"message": str(error)})
-        self.q.put(f"[ERROR]{str(error)}")
-        self.q.put(None)
+def _encode_sse(etype: str, payload, event_id: int = None) -> str:
+    """
+    一个 SSE 事件：可选的 id 行、event 行，载荷 JSON 编码后按行拆成多个 data 行
+    （JSON 会转义 \\r、\\n，正常情况下只有一行）
+    """
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"{head}event: {etype}\n{lines}\n"
 
-    # ============ 进度事件 ============
-    def on_chain_start(self, serialized, inputs, **kwargs):
-        name = (serialized or {}).get("name") or (serialized or {}).get("id") or "chain"
-        self._event("chain_start", {"name": name, "inputs": self._safe(inputs)})
 
-    def on_chain_end(self, outputs, **kwargs):
-        self._event("chain_end", {"outputs": self._safe(outputs)})
+def _encode_text(etype: str, payload) -> str:
+    """旧版 text/plain 格式：token 原样输出，其他事件以 [EVENT] 行穿插"""
+    if etype == "token":
+        return payload
+    if etype == "done":
+        return "[DONE]"
+    data = "\n[EVENT]" + json.dumps({"type": etype, "payload": payload}, ensure_ascii=False, default=str) + "\n"
+    if etype == "error":
+        data += f"[ERROR]{payload['message']}"
+    return data
 
-    def on_tool_start(self, serialized, input_str, **kwargs):
-        name = (serialized or {}).get("name") or "tool"
-        self._event("tool_start", {"name": name, "input": self._safe(input_str)})
 
-    def on_tool_end(self, output, **kwargs):
-        # 避免把大段文档原文直接塞进事件，可仅传长度
-        out_preview = output if isinstance(output, str) and len(output) < 500 else f"[len={len(str(output))}]"
-        self._event("tool_end", {"output": out_preview})
+class EventStreamRenderer(BaseRenderer):
+    """让内容协商接受 text/event-stream；流本身由视图直接编码"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
 
-    # ============ 帮助方法 ============
-    def _event(self, etype: str, payload: dict):
-        try:
-            data = json.dumps({"type": etype, "payload": payload}, ensure_ascii=False)
-        except Exception:
-            data = json.dumps({"type": etype, "payload": str(payload)}, ensure_ascii=False)
-        # 单独一条队列消息并带换行，降低与 token 拼接的概率
-        self.q.put("\n[EVENT]" + data + "\n")
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # 仅用于参数校验失败等非流式响应
+        return _encode_sse("error", data).encode(self.charset)
 
-    def _safe(self, obj):
-        try:
-            if isinstance(obj, (str, int, float, bool)) or obj is None:
-                return obj
-            return json.loads(json.dumps(obj, ensure_ascii=False, default=str))
-        except Exception:
-            return str(obj)
 
 class ChatStreamView(APIView):
+    """流式对话
+
+    默认返回 text/plain（token 中穿插 [EVENT] 行）；请求头 Accept 为
+    text/event-stream 或 ?format=sse 时返回 SSE，事件类型为 token、
+    tool_start、tool_end、error、done。?events=tokens|tools|all 控制
+    推送哪些进度事件，默认 tools。
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = ChatSerializer
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
 
     def post(self, request, *args, **kwargs):
+        from .src.Agents import AgentClass
+        from .src.Streaming import StreamCallback, StreamCancelled
+
         user_id = request.user.userid
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         message = serializer.validated_data['message']
         session_id = serializer.validated_data['session_id']
 
+        sse = request.accepted_renderer.format == 'sse'
+        if sse:
+            # 事件 id 在本次响应内递增，便于客户端确认事件顺序与是否有遗漏
+            event_ids = itertools.count(1)
+            encode = lambda etype, payload: _encode_sse(etype, payload, next(event_ids))
+        else:
+            encode = _encode_text
+        heartbeat = ": ping\n\n" if sse else "\n"
+        level = request.query_params.get("events", "tools")
+
         q = queue.Queue(maxsize=1000)
-        cb = StreamCallback(q)
+        cancel_event = threading.Event()
+        cb = StreamCallback(q, cancel_event, level=level)
+        finished = threading.Event()
+        # 本次对话的 token 用量（含前缀缓存命中数）与触发的执行上限，随 done 事件返回
+        result = {}
+        started_at = time.time()
+        _record_stream(started=1)
 
         def run():
             try:
-                agent = AgentClass(user_id, session_id, streaming=True)
-                agent.run_agent(message, callbacks=[cb])
+                agent = AgentClass(user_id, session_id, streaming=True, user=request.user)
+                result.update(agent.run_agent(message, callbacks=[cb], cancel_event=cancel_event))
+            except StreamCancelled:
+                pass
             except Exception as e:
-                q.put(f"[ERROR]{str(e)}")
+                try:
+                    cb._put(("error", {"message": str(e)}))
+                except StreamCancelled:
+                    pass
             finally:
-                q.put(None)
+                finished.set()
+                if cancel_event.is_set():
+                    metrics = _record_stream(cancelled=1, cancelled_tokens=cb.token_count,
+                                             cancelled_seconds=time.time() - started_at)
+                    logger.info(f"session {session_id} 客户端断开，已取消生成（已产生 {cb.token_count} 个 token）; 累计: {metrics}")
+                else:
+                    _record_stream(completed=1)
+                    try:
+                        cb._put(None)
+                    except StreamCancelled:
+                        pass
 
         t = threading.Thread(target=run, daemon=True)
         t.start()
 
         def event_stream():
-            yield ""  # 触发 header 发送
-            last_flush = time.time()
-            buf = []
-            while True:
-                try:
-                    item = q.get(timeout=0.1)
-                except queue.Empty:
-                    # 定时心跳，避免中间层缓冲
-                    if time.time() - last_flush > 10:
-                        yield "\n"
-                        last_flush = time.time()
-                    continue
-                if item is None:
-                    if buf:
-                        chunk = "".join(buf)
-                        yield chunk
-                        buf = []
-                    break
-                buf.append(item)
-                # 小批量聚合，减少过多系统调用
-                if len(buf) >= 10 or (time.time() - last_flush) > 0.2:
-                    chunk = "".join(buf)
-                    yield chunk
-                    buf = []
+            try:
+                yield ""  # 触发 header 发送
+                last_flush = time.time()
+                # 连续的 token 合并为一个块/一个 token 事件，减少过多系统调用
+                tokens = []
+
+                def flush_tokens():
+                    chunk = encode("token", {"text": "".join(tokens)} if sse else "".join(tokens))
+                    tokens.clear()
+                    return chunk
+
+                while True:
+                    try:
+                        item = q.get(timeout=0.1)
+                    except queue.Empty:
+                        if tokens:
+                            yield flush_tokens()
+                            last_flush = time.time()
+                        # 定时心跳，避免中间层缓冲；写失败时服务器会关闭本生成器
+                        elif time.time() - last_flush > 10:
+                            yield heartbeat
+                            last_flush = time.time()
+                        continue
+                    if item is None:
+                        if tokens:
+                            yield flush_tokens()
+                        break
+                    etype, payload = item
+                    if etype == "token":
+                        tokens.append(payload)
+                        if len(tokens) < 10 and (time.time() - last_flush) <= 0.2:
+                            continue
+                        yield flush_tokens()
+                    else:
+                        if tokens:
+                            yield flush_tokens()
+                        yield encode(etype, payload)
                     last_flush = time.time()
-            yield "[DONE]"
+                yield encode("done", {"tokens": cb.token_count, "usage": result.get("usage"), "limits": result.get("limits", [])})
+            finally:
+                # 客户端断开时 WSGI 服务器会 close() 生成器（GeneratorExit），通知后台线程停止
+                if not finished.is_set():
+                    cancel_event.set()
 
-        resp = StreamingHttpResponse(event_stream(), content_type='text/plain; charset=utf-8')
+        content_type = 'text/event-stream; charset=utf-8' if sse else 'text/plain; charset=utf-8'
+        resp = StreamingHttpResponse(event_stream(), content_type=content_type)
         resp['Cache-Control'] = 'no-cache'
         resp['X-Accel-Buffering'] = 'no'  # 兼容 Nginx 关闭缓冲
         return resp
-        
\ No newline at end of file
+
+
+class ReadinessView(APIView):
+    """就绪检查：供负载均衡探测，本进程 AI 组件预热完成前返回 503
+
+    首次探测会在后台开始预热；?components=1 时附带各组件耗时与错误信息。
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, *args, **kwargs):
+        from .src.Warmup import readiness
+
+        readiness.ensure_started()
+        snapshot = readiness.snapshot()
+        if not request.query_params.get('components'):
+            snapshot.pop('components')
+        code = status.HTTP_200_OK if snapshot['status'] == 'ready' else status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response(snapshot, status=code)
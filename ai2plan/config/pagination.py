@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    全局游标分页。DRF 的游标只记录排序第一列的值，再加上“该值下已跳过几行”的偏移：
+    默认按 -id 排序时是纯 keyset 翻页，每页耗时与数据总量无关；
+    视图用 cursor_ordering 指定以非唯一列开头的排序（如交易的 -date, -id）时，
+    每页先按第一列定位，再在同值的行里按偏移跳过，耗时随同一值的行数增长（偏移上限为 offset_cutoff）。
+    最后一列需唯一（通常为 id）以保证顺序稳定
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return tuple(ordering)
+        return super().get_ordering(request, queryset, view)
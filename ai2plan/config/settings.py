@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,6 +48,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'chat',
     'leetcode',
+    'search',
     'rest_framework_simplejwt',
 ]
 
@@ -65,9 +70,13 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {  
+    # 在 JWTAuthentication 基础上缓存用户状态，AUTH_USER_CACHE_TTL（秒，默认 60，0 为关闭）
     'DEFAULT_AUTHENTICATION_CLASSES': [  
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  
+        'users.authentication.CachedJWTAuthentication',  
     ],  
+    # 列表接口统一游标分页，?page_size= 可调整，上限见 IdCursorPagination.max_page_size
+    'DEFAULT_PAGINATION_CLASS': 'config.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
 } 
 
 MIDDLEWARE = [
@@ -104,11 +113,74 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite（默认）或 postgresql，其余参数见 README
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DB_POOL = os.getenv('DB_POOL', 'false').lower() in ('1', 'true', 'yes')
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'ai2plan'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # 持久连接：同一 worker 线程跨请求复用连接，复用前先做健康检查；
+            # 开启 DB_POOL（psycopg 3 连接池）时由连接池管理，两者不能同时使用
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    # DB_SQLITE_TUNING=false 时使用 Django 默认参数（回滚日志、5 秒锁等待、延迟加写锁），便于对比
+    DB_SQLITE_TUNING = os.getenv('DB_SQLITE_TUNING', 'true').lower() in ('1', 'true', 'yes')
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # 写锁被占用时最多等待的秒数（busy_timeout），而不是立即报 database is locked
+                'timeout': int(os.getenv('DB_SQLITE_TIMEOUT', '20')),
+                # 事务开始即获取写锁，避免读锁升级写锁时的死锁式 SQLITE_BUSY
+                'transaction_mode': 'IMMEDIATE',
+                # 每个连接建立时执行：WAL 让读写互不阻塞，NORMAL 同步在 WAL 下仍保证一致性，mmap 减少读的系统调用
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA mmap_size={int(os.getenv('DB_SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))};"
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            } if DB_SQLITE_TUNING else {},
+        }
     }
+
+
+# Cache
+# 搜索工具结果缓存：默认进程内 LRU；配置 SEARCH_CACHE_URL（redis://...）后多个 worker 共享
+
+SEARCH_CACHE_URL = os.getenv('SEARCH_CACHE_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'search': {
+        'BACKEND': ('django.core.cache.backends.redis.RedisCache' if SEARCH_CACHE_URL
+                    else 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': SEARCH_CACHE_URL or 'search',
+        'TIMEOUT': int(os.getenv('SEARCH_CACHE_TTL', '300')),
+        'OPTIONS': {} if SEARCH_CACHE_URL else {
+            'MAX_ENTRIES': int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '1000')),
+        },
+    },
 }
 
 
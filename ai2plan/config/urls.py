@@ -17,16 +17,18 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from users.views import LoginView, RefreshTokenView, RegisterView
-from todo.views import TodoViewSet
+from todo.views import TodoViewSet, TodoSeriesViewSet
 from chat.views import HistoryViewSet
 from leetcode.views import LeetcodeViewSet
 from accounting.views import AccountViewSet, CategoryViewSet, TransactionViewSet
-from chat.views import ChatView, AddDocView, ChatStreamView
+from search.views import SearchView
+from chat.views import ChatView, AddDocView, ChatStreamView, ReadinessView
 from django.urls import include
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
 router.register(r'todos', TodoViewSet, basename='todo')
+router.register(r'todo-series', TodoSeriesViewSet, basename='todo-series')
 router.register(r'accounts', AccountViewSet, basename='account')
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'transactions', TransactionViewSet, basename='transaction')
@@ -38,6 +40,9 @@ urlpatterns = [
     path('api/refresh-token/', RefreshTokenView.as_view(), name='refresh-token'),
     path('api/register/', RegisterView.as_view(), name='register'),
     path('api/chat/', ChatView.as_view(), name='chat'),
+    path('api/chat/stream/', ChatStreamView.as_view(), name='chat-stream'),
     path('api/add-doc/', AddDocView.as_view(), name='add-doc'),
+    path('api/search/', SearchView.as_view(), name='search'),
+    path('api/ready/', ReadinessView.as_view(), name='ready'),
     path('api/', include(router.urls)),
 ]
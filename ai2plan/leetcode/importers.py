@@ -0,0 +1,183 @@
+"""
+力扣题库批量导入：流式读取 JSON 数组或 JSONL，按批校验，
+以 (user, slug) 为键 bulk_create(update_conflicts=True) 做 upsert
+"""
+import io
+import json
+import re
+import time
+
+from .models import Leetcode
+from search.indexing import index_many
+
+BATCH_SIZE = 500
+MAX_ERRORS = 50
+READ_SIZE = 64 * 1024
+# JSON 数组中单条记录的最大字符数；超过仍无法解析视为格式错误，避免对坏数据反复拼接重解析
+MAX_RECORD_CHARS = 1024 * 1024
+# 缓冲区末尾被截断的字面量（如 tru、-Infinit）最长不超过这么多字符
+_MAX_PARTIAL_TOKEN = 16
+DIFFICULTIES = {key for key, _ in Leetcode.DIFFICULTY_CHOICES}
+DIFFICULTY_ALIASES = {'简单': 'easy', '中等': 'medium', '困难': 'hard'}
+# 已存在的题目只刷新题面信息，不覆盖用户自己的解法、思路与完成状态
+UPDATE_FIELDS = ['title', 'difficulty', 'description']
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return ImportRowError(f'JSON 解析失败: {e}')
+
+
+def iter_json_records(fileobj, encoding='utf-8'):
+    """
+    逐条产出 (行号, 记录)：以 '[' 开头按 JSON 数组增量解析（行号为数组下标，从 1 开始），
+    否则按 JSONL 逐行解析，均不把整个文件读入内存。
+    JSONL 中无法解析的行产出 ImportRowError 作为记录，由导入器计入跳过，不中断整个文件
+    """
+    text = io.TextIOWrapper(fileobj, encoding=encoding) if isinstance(fileobj.read(0), bytes) else fileobj
+    buf = text.read(READ_SIZE).lstrip('\ufeff')
+    stripped = buf.lstrip()
+    if not stripped.startswith('['):
+        # JSONL：把已读的部分与剩余行拼接起来逐行处理
+        pending = ''
+        lineno = 0
+        while buf:
+            lines = (pending + buf).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                lineno += 1
+                if line.strip():
+                    yield lineno, _parse_line(line)
+            buf = text.read(READ_SIZE)
+        if pending.strip():
+            yield lineno + 1, _parse_line(pending)
+        return
+
+    decoder = json.JSONDecoder()
+    buf = stripped[1:]
+    pos = 0
+    index = 0
+    while True:
+        # 跳过分隔符与空白
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf):
+                break
+            more = text.read(READ_SIZE)
+            if not more:
+                raise ValueError('JSON 数组未正确结束')
+            buf, pos = more, 0
+        if buf[pos] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            # 出错位置之后还有完整内容（不只是被截断的字符串或字面量），再读也无法解析
+            truncated = e.msg.startswith('Unterminated string') or len(buf) - e.pos <= _MAX_PARTIAL_TOKEN
+            if not truncated or len(buf) - pos > MAX_RECORD_CHARS:
+                raise ValueError(f'第 {index + 1} 条记录 JSON 格式错误: {e.msg}') from e
+            # 当前缓冲区里的对象不完整，继续读
+            more = text.read(READ_SIZE)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+        index += 1
+        yield index, obj
+        pos = end
+
+
+def _slugify(value):
+    return re.sub(r'[^0-9a-z一-鿿]+', '-', str(value).strip().lower()).strip('-')
+
+
+def _build(user, record):
+    if isinstance(record, ImportRowError):
+        raise record
+    if not isinstance(record, dict):
+        raise ImportRowError('每条记录必须是对象')
+    title = str(record.get('title') or '').strip()
+    if not title:
+        raise ImportRowError('缺少 title')
+    # 兼容常见题库导出的字段名
+    slug = record.get('slug') or record.get('titleSlug') or record.get('questionFrontendId') or record.get('id') or title
+    slug = _slugify(slug)[:255]
+    if not slug:
+        raise ImportRowError('无法确定题目标识 slug')
+    difficulty = str(record.get('difficulty') or 'easy').strip()
+    difficulty = DIFFICULTY_ALIASES.get(difficulty, difficulty.lower())
+    if difficulty not in DIFFICULTIES:
+        raise ImportRowError(f'difficulty 仅支持 easy/medium/hard: {difficulty!r}')
+    return Leetcode(
+        user=user,
+        slug=slug,
+        title=title[:255],
+        difficulty=difficulty,
+        description=str(record.get('description') or record.get('content') or ''),
+        solution=str(record.get('solution') or ''),
+        thinking=str(record.get('thinking') or ''),
+        completed=bool(record.get('completed', False)),
+    )
+
+
+class LeetcodeImporter:
+    def __init__(self, user, batch_size=BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.upserted = 0
+        self.skipped = 0
+        self.errors = []
+
+    def _reject(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': line, 'error': message})
+
+    def _flush(self, rows):
+        # 同一批内重复的 slug 以最后一条为准，否则 ON CONFLICT 会在一条语句里命中同一行两次；
+        # 被覆盖的那条计入跳过
+        latest = {}
+        for line, obj in rows:
+            if obj.slug in latest:
+                self._reject(latest[obj.slug][0], f'slug {obj.slug!r} 与第 {line} 条重复，以后者为准')
+            latest[obj.slug] = (line, obj)
+        batch = [obj for _, obj in latest.values()]
+        objs = Leetcode.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['user', 'slug'],
+            update_fields=UPDATE_FIELDS,
+        )
+        # bulk_create 不触发 post_save；已存在的行保留了原有解法，重新读取后再写检索文档
+        index_many(Leetcode.objects.filter(pk__in=[obj.pk for obj in objs]))
+        self.upserted += len(batch)
+
+    def run(self, records):
+        start = time.perf_counter()
+        batch = []
+        for line, record in records:
+            try:
+                batch.append((line, _build(self.user, record)))
+            except ImportRowError as e:
+                self._reject(line, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        seconds = time.perf_counter() - start
+        return {
+            'upserted': self.upserted,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(self.upserted / seconds, 1) if seconds else self.upserted,
+        }
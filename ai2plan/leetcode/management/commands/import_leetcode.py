@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from leetcode.importers import BATCH_SIZE, LeetcodeImporter, iter_json_records
+
+
+class Command(BaseCommand):
+    help = "从本地 JSON/JSONL 题库文件为指定用户批量导入（upsert）力扣题目"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="题库文件路径（JSON 数组或每行一个对象的 JSONL）")
+        parser.add_argument("--user", required=True, help="导入到该用户名下")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批写入的条数")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"用户不存在: {options['user']}")
+
+        importer = LeetcodeImporter(user, batch_size=options["batch_size"])
+        try:
+            with open(options["path"], encoding="utf-8") as f:
+                result = importer.run(iter_json_records(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"导入失败（已写入 {importer.upserted} 条）: {e}")
+
+        for error in result["errors"]:
+            self.stderr.write(f"第 {error['row']} 条: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"导入 {result['upserted']} 条，跳过 {result['skipped']} 条，"
+            f"用时 {result['seconds']}s（{result['rows_per_second']} 条/秒）"
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leetcode', '0002_remove_leetcode_answer_leetcode_difficulty_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leetcode',
+            index=models.Index(fields=['user', '-id'], name='leetcode_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leetcode',
+            index=models.Index(fields=['user', 'difficulty'], name='leetcode_user_difficulty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leetcode',
+            index=models.Index(fields=['user', 'completed'], name='leetcode_user_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leetcode', '0003_leetcode_leetcode_user_id_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leetcode',
+            name='slug',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='leetcode',
+            constraint=models.UniqueConstraint(fields=('user', 'slug'), name='unique_leetcode_user_slug'),
+        ),
+    ]
@@ -10,6 +10,8 @@ class Leetcode(models.Model):
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # 题库导入时的题目标识（如 two-sum），同一用户内唯一；手动创建的题目可为空
+    slug = models.CharField(max_length=255, null=True, blank=True)
     title = models.CharField(max_length=255)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='easy')
     description = models.TextField(default='')
@@ -17,5 +19,15 @@ class Leetcode(models.Model):
     thinking = models.TextField(default='')  # 解题思路
     completed = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'slug'], name='unique_leetcode_user_slug'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-id'], name='leetcode_user_id_idx'),
+            models.Index(fields=['user', 'difficulty'], name='leetcode_user_difficulty_idx'),
+            models.Index(fields=['user', 'completed'], name='leetcode_user_completed_idx'),
+        ]
+
     def __str__(self):
         return self.title
\ No newline at end of file
@@ -1,8 +1,20 @@
 from rest_framework import serializers
 from .models import Leetcode
 
+LIST_FIELDS = ('id', 'slug', 'title', 'difficulty', 'completed')
+
 class LeetcodeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Leetcode
         fields = '__all__'
-        read_only_fields = ('user',)
\ No newline at end of file
+        read_only_fields = ('user',)
+
+
+class LeetcodeListSerializer(serializers.ModelSerializer):
+    """
+    列表页只需要标题、难度与完成状态，不返回题目描述、解法和思路等大文本
+    """
+    class Meta:
+        model = Leetcode
+        fields = LIST_FIELDS
+        read_only_fields = fields
@@ -1,3 +1,161 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from search.models import SearchDocument
+from users.models import User
+from .importers import READ_SIZE, iter_json_records
+from .models import Leetcode
+
+
+@skipUnless(connection.vendor == 'sqlite', '查询计划断言基于 SQLite 的 EXPLAIN QUERY PLAN 输出')
+class LeetcodeQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='plan', password='pw')
+
+    def test_list_uses_user_id_index(self):
+        plan = Leetcode.objects.filter(user=self.user).order_by('-id').explain()
+        self.assertIn('USING INDEX leetcode_user_id_idx', plan)
+
+    def test_filter_by_difficulty_uses_composite_index(self):
+        plan = Leetcode.objects.filter(user=self.user, difficulty='hard').explain()
+        self.assertIn('USING INDEX leetcode_user_difficulty_idx (user_id=? AND difficulty=?)', plan)
+
+
+class LeetcodeStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='stats', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        Leetcode.objects.bulk_create([
+            Leetcode(user=cls.user, title='a', difficulty='easy', completed=True),
+            Leetcode(user=cls.user, title='b', difficulty='easy'),
+            Leetcode(user=cls.user, title='c', difficulty='hard', completed=True, description='x' * 1000),
+            Leetcode(user=other, title='d', difficulty='medium'),
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stats_is_single_aggregate_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/leetcode/stats/').json()
+        self.assertEqual((data['total'], data['completed'], data['uncompleted']), (3, 2, 1))
+        self.assertEqual(data['by_difficulty']['easy']['total'], 2)
+        self.assertEqual(data['by_difficulty']['medium']['total'], 0)
+        self.assertEqual(data['by_difficulty']['hard']['completed'], 1)
+
+    def test_list_defers_text_columns(self):
+        with self.assertNumQueries(1) as ctx:
+            rows = self.client.get('/api/leetcode/').json()['results']
+        self.assertNotIn('description', ctx.captured_queries[0]['sql'])
+        self.assertEqual(set(rows[0]), {'id', 'slug', 'title', 'difficulty', 'completed'})
+        detail = self.client.get(f"/api/leetcode/{rows[0]['id']}/").json()
+        self.assertEqual(len(detail['description']), 1000)
+
+
+PROBLEMS = [
+    {'titleSlug': 'two-sum', 'title': 'Two Sum', 'difficulty': '简单', 'content': 'hashmap lookup'},
+    {'slug': 'lru-cache', 'title': 'LRU Cache', 'difficulty': 'Medium', 'description': 'linked list'},
+]
+
+
+class LeetcodeImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='importer', password='pw')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _upload(self, content, name='problems.json'):
+        upload = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post('/api/leetcode/import/', {'file': upload}, format='multipart')
+
+    def test_import_json_array_is_idempotent(self):
+        response = self._upload(json.dumps(PROBLEMS, ensure_ascii=False))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()['upserted'], response.json()['skipped']), (2, 0))
+        two_sum = Leetcode.objects.get(user=self.user, slug='two-sum')
+        self.assertEqual((two_sum.difficulty, two_sum.description), ('easy', 'hashmap lookup'))
+
+        # 再次导入按 slug 更新题面，保留用户自己的解法与完成状态
+        two_sum.solution, two_sum.completed = 'dict', True
+        two_sum.save()
+        changed = [dict(PROBLEMS[0], content='hashmap in one pass'), PROBLEMS[1]]
+        self.assertEqual(self._upload(json.dumps(changed)).status_code, 201)
+        self.assertEqual(Leetcode.objects.filter(user=self.user).count(), 2)
+        two_sum.refresh_from_db()
+        self.assertEqual((two_sum.description, two_sum.solution, two_sum.completed),
+                         ('hashmap in one pass', 'dict', True))
+
+        docs = SearchDocument.objects.filter(user=self.user, kind='leetcode')
+        self.assertEqual(docs.count(), 2)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'one pass'}).json()['results'][0]['object_id'],
+                         two_sum.pk)
+
+    def test_import_jsonl_skips_bad_lines(self):
+        lines = [json.dumps(PROBLEMS[0]), '', '{"title": "broken",', json.dumps({'title': ''}),
+                 json.dumps({'title': 'Bad', 'difficulty': 'extreme'}), json.dumps(PROBLEMS[1])]
+        response = self._upload('\n'.join(lines), name='problems.jsonl')
+        self.assertEqual(response.status_code, 201, response.content)
+        result = response.json()
+        self.assertEqual((result['upserted'], result['skipped']), (2, 3))
+        # 行号按文件中的实际行计算，空行也计入
+        self.assertEqual([e['row'] for e in result['errors']], [3, 4, 5])
+        self.assertIn('JSON 解析失败', result['errors'][0]['error'])
+        self.assertEqual(set(Leetcode.objects.filter(user=self.user).values_list('slug', flat=True)),
+                         {'two-sum', 'lru-cache'})
+
+    def test_repeated_slug_in_one_batch_is_counted_as_skipped(self):
+        problems = [PROBLEMS[0], dict(PROBLEMS[0], title='Two Sum II'), PROBLEMS[1]]
+        result = self._upload(json.dumps(problems)).json()
+        # 每条输入要么写入要么跳过，合计与输入条数一致
+        self.assertEqual((result['upserted'], result['skipped']), (2, 1))
+        self.assertEqual([e['row'] for e in result['errors']], [1])
+        self.assertEqual(Leetcode.objects.get(user=self.user, slug='two-sum').title, 'Two Sum II')
+
+    def test_malformed_array_element_fails_without_reading_the_rest(self):
+        class CountingReader(StringIO):
+            reads = 0
+
+            def read(self, *args):
+                self.reads += 1
+                return super().read(*args)
+
+        body = '[{"title": "a" "slug": "x"}, ' + ', '.join([json.dumps(PROBLEMS[1])] * 20000) + ']'
+        reader = CountingReader(body)
+        with self.assertRaisesMessage(ValueError, '第 1 条记录 JSON 格式错误'):
+            list(iter_json_records(reader))
+        self.assertLess(reader.reads, 4)
+        self.assertGreater(len(body), READ_SIZE * 10)
+
+        response = self._upload(body)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('第 1 条记录', response.json()['error'])
+
+    def test_import_requires_file(self):
+        self.assertEqual(self.client.post('/api/leetcode/import/', {}, format='multipart').status_code, 400)
 
-# Create your tests here.
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8', delete=False) as f:
+            f.write('\n'.join(json.dumps(p) for p in PROBLEMS) + '\nnot json\n')
+        self.addCleanup(os.unlink, f.name)
+        out, err = StringIO(), StringIO()
+        for _ in range(2):
+            call_command('import_leetcode', f.name, user='importer', batch_size=1, stdout=out, stderr=err)
+        self.assertIn('导入 2 条，跳过 1 条', out.getvalue())
+        self.assertIn('第 3 条', err.getvalue())
+        self.assertEqual(Leetcode.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(SearchDocument.objects.filter(user=self.user, kind='leetcode').count(), 2)
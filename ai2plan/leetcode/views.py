@@ -1,7 +1,13 @@
 from rest_framework.viewsets import ModelViewSet
 from .models import Leetcode
-from .serializers import LeetcodeSerializer
+from .serializers import LIST_FIELDS, LeetcodeListSerializer, LeetcodeSerializer
+from .importers import LeetcodeImporter, iter_json_records
 from rest_framework import permissions
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from django.db.models import Count, Q
 
 
 # Create your views here.
@@ -11,7 +17,61 @@ class LeetcodeViewSet(ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Leetcode.objects.filter(user=self.request.user)
+        queryset = Leetcode.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            # 列表不读取 description/solution/thinking，打开详情时再取完整记录
+            queryset = queryset.only(*LIST_FIELDS)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return LeetcodeListSerializer
+        return LeetcodeSerializer
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        上传题库文件 file（JSON 数组或 JSONL），按 slug 新增或更新当前用户的题目
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': '请上传 file'}, status=status.HTTP_400_BAD_REQUEST)
+        importer = LeetcodeImporter(request.user)
+        try:
+            result = importer.run(iter_json_records(upload))
+        except (UnicodeDecodeError, ValueError) as e:
+            return Response({'error': f'文件解析失败: {e}', 'upserted': importer.upserted},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        按难度与完成状态统计题目数，一条聚合查询完成
+        """
+        counts = {}
+        for difficulty, _ in Leetcode.DIFFICULTY_CHOICES:
+            counts[f'{difficulty}_total'] = Count('id', filter=Q(difficulty=difficulty))
+            counts[f'{difficulty}_completed'] = Count('id', filter=Q(difficulty=difficulty, completed=True))
+        row = Leetcode.objects.filter(user=request.user).aggregate(
+            total_count=Count('id'),
+            completed_count=Count('id', filter=Q(completed=True)),
+            **counts,
+        )
+        by_difficulty = {
+            difficulty: {
+                'label': label,
+                'total': row[f'{difficulty}_total'],
+                'completed': row[f'{difficulty}_completed'],
+            }
+            for difficulty, label in Leetcode.DIFFICULTY_CHOICES
+        }
+        return Response({
+            'total': row['total_count'],
+            'completed': row['completed_count'],
+            'uncompleted': row['total_count'] - row['completed_count'],
+            'by_difficulty': by_difficulty,
+        })
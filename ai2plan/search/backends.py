@@ -0,0 +1,93 @@
+"""
+全文检索查询：SQLite 走 FTS5（bm25 排序），PostgreSQL 走 tsvector（ts_rank 排序），
+其他数据库或过短的查询词退化为按用户限定的包含匹配
+"""
+from django.db import connection
+from django.db.models import Q
+
+from .models import SearchDocument
+
+# trigram 分词下少于 3 个字符的词无法走 FTS 索引
+MIN_FTS_TERM = 3
+
+
+def _fts5_query(terms):
+    # 每个词作为短语加引号，避免用户输入被解析为 FTS5 语法
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _user_param(user):
+    # 原生 SQL 中的用户 id 需按数据库的 UUID 存储格式转换
+    return SearchDocument._meta.get_field('user').get_db_prep_value(user.pk, connection)
+
+
+def _kind_clause(kinds, params):
+    if not kinds:
+        return ''
+    params.extend(kinds)
+    return f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+
+
+def _search_sqlite(user, terms, kinds, limit):
+    params = [_fts5_query(terms), _user_param(user)]
+    sql = (
+        "SELECT d.kind, d.object_id, d.title,"
+        " snippet(search_searchdocument_fts, 1, '[', ']', '…', 16),"
+        " bm25(search_searchdocument_fts, 2.0, 1.0) AS rank"
+        " FROM search_searchdocument_fts"
+        " JOIN search_searchdocument d ON d.id = search_searchdocument_fts.rowid"
+        " WHERE search_searchdocument_fts MATCH %s AND d.user_id = %s"
+    )
+    sql += _kind_clause(kinds, params)
+    sql += " ORDER BY rank LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        # bm25 越小越相关，取负数使 rank 越大越相关
+        return [
+            {'kind': kind, 'object_id': object_id, 'title': title, 'snippet': snippet, 'rank': -rank}
+            for kind, object_id, title, snippet, rank in cursor.fetchall()
+        ]
+
+
+def _search_postgresql(user, terms, kinds, limit):
+    vector = "to_tsvector('simple', d.title || ' ' || d.body)"
+    params = [' '.join(terms), _user_param(user)]
+    sql = (
+        f"SELECT d.kind, d.object_id, d.title, left(d.body, 120), ts_rank({vector}, q) AS rank"
+        f" FROM search_searchdocument d, plainto_tsquery('simple', %s) q"
+        f" WHERE {vector} @@ q AND d.user_id = %s"
+    )
+    sql += _kind_clause(kinds, params)
+    sql += " ORDER BY rank DESC LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {'kind': kind, 'object_id': object_id, 'title': title, 'snippet': snippet, 'rank': rank}
+            for kind, object_id, title, snippet, rank in cursor.fetchall()
+        ]
+
+
+def _search_fallback(user, terms, kinds, limit):
+    qs = SearchDocument.objects.filter(user=user)
+    if kinds:
+        qs = qs.filter(kind__in=kinds)
+    for term in terms:
+        qs = qs.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return [
+        {'kind': doc.kind, 'object_id': doc.object_id, 'title': doc.title, 'snippet': doc.body[:120], 'rank': 0}
+        for doc in qs.order_by('-id')[:limit]
+    ]
+
+
+def search_documents(user, query, kinds=None, limit=20):
+    terms = query.split()
+    if not terms:
+        return []
+    vendor = connection.vendor
+    if vendor == 'sqlite' and all(len(term) >= MIN_FTS_TERM for term in terms):
+        return _search_sqlite(user, terms, kinds, limit)
+    if vendor == 'postgresql':
+        return _search_postgresql(user, terms, kinds, limit)
+    return _search_fallback(user, terms, kinds, limit)
@@ -0,0 +1,65 @@
+"""
+业务对象 -> SearchDocument 的映射与同步
+"""
+from .models import SearchDocument
+
+
+def _todo(obj):
+    return obj.title, obj.description or ''
+
+
+def _leetcode(obj):
+    return obj.title, '\n'.join(filter(None, [obj.description, obj.thinking, obj.solution]))
+
+
+def _transaction(obj):
+    return '', obj.description or ''
+
+
+# 模型 label -> (kind, 取 title/body 的函数)
+INDEXED_MODELS = {
+    'todo.Todo': ('todo', _todo),
+    'leetcode.Leetcode': ('leetcode', _leetcode),
+    'accounting.Transaction': ('transaction', _transaction),
+}
+
+
+def _spec(obj):
+    return INDEXED_MODELS[obj._meta.label]
+
+
+def index_object(obj):
+    kind, extract = _spec(obj)
+    title, body = extract(obj)
+    SearchDocument.objects.update_or_create(
+        kind=kind, object_id=obj.pk,
+        defaults={'user_id': obj.user_id, 'title': title[:255], 'body': body},
+    )
+
+
+def index_many(objs, batch_size=1000):
+    """
+    批量写入（供 bulk_create 导入使用，bulk_create 不会触发 post_save）
+    """
+    docs = []
+    for obj in objs:
+        kind, extract = _spec(obj)
+        title, body = extract(obj)
+        docs.append(SearchDocument(user_id=obj.user_id, kind=kind, object_id=obj.pk, title=title[:255], body=body))
+    SearchDocument.objects.bulk_create(
+        docs, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=['title', 'body'],
+    )
+
+
+def unindex_object(obj):
+    kind, _ = _spec(obj)
+    SearchDocument.objects.filter(kind=kind, object_id=obj.pk).delete()
+
+
+def unindex_queryset(queryset):
+    """
+    按查询集批量删除检索文档（一条 DELETE，配合业务侧的批量删除使用）
+    """
+    kind, _ = INDEXED_MODELS[queryset.model._meta.label]
+    SearchDocument.objects.filter(kind=kind, object_id__in=queryset.values('pk')).delete()
@@ -0,0 +1,81 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    # 外部内容 FTS5 表：只存倒排索引，原文仍在 search_searchdocument；trigram 分词可检索中文子串
+    """CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5(
+        title, body, content='search_searchdocument', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER search_searchdocument_ai AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER search_searchdocument_ad AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER search_searchdocument_au AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS search_searchdocument_au",
+    "DROP TRIGGER IF EXISTS search_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS search_searchdocument_ai",
+    "DROP TABLE IF EXISTS search_searchdocument_fts",
+]
+POSTGRES_FORWARD = [
+    """CREATE INDEX search_doc_tsv_idx ON search_searchdocument
+       USING GIN (to_tsvector('simple', title || ' ' || body))""",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS search_doc_tsv_idx",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD})
+
+
+def backfill_documents(apps, schema_editor):
+    """为已有的待办、力扣题目和交易生成检索文档"""
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    sources = [
+        ('todo', apps.get_model('todo', 'Todo'), lambda o: (o.title, o.description or '')),
+        ('leetcode', apps.get_model('leetcode', 'Leetcode'),
+         lambda o: (o.title, '\n'.join(filter(None, [o.description, o.thinking, o.solution])))),
+        ('transaction', apps.get_model('accounting', 'Transaction'), lambda o: ('', o.description or '')),
+    ]
+    for kind, model, extract in sources:
+        docs = []
+        for obj in model.objects.iterator(chunk_size=1000):
+            title, body = extract(obj)
+            docs.append(SearchDocument(user_id=obj.user_id, kind=kind, object_id=obj.pk, title=title[:255], body=body))
+            if len(docs) >= 1000:
+                SearchDocument.objects.bulk_create(docs)
+                docs = []
+        SearchDocument.objects.bulk_create(docs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('todo', '0002_todo_todo_user_id_idx_todo_todo_user_open_due_idx'),
+        ('leetcode', '0003_leetcode_leetcode_user_id_idx_and_more'),
+        ('accounting', '0004_transaction_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import models
+from users.models import User
+
+# Create your models here.
+class SearchDocument(models.Model):
+    """
+    全文检索文档：每条待办 / 力扣题目 / 交易记录对应一行。
+    SQLite 下由 FTS5 外部内容表 search_searchdocument_fts 建索引，
+    PostgreSQL 下由 to_tsvector 表达式上的 GIN 索引建索引（见迁移）
+    """
+    KIND_CHOICES = [
+        ('todo', '待办'),
+        ('leetcode', '力扣'),
+        ('transaction', '交易'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_documents')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255, blank=True, default='')
+    body = models.TextField(blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'kind'], name='search_doc_user_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
@@ -0,0 +1,19 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from .indexing import INDEXED_MODELS, index_object, unindex_object
+
+
+def _on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_object(instance)
+
+
+def _on_delete(sender, instance, **kwargs):
+    unindex_object(instance)
+
+
+for label in INDEXED_MODELS:
+    model = apps.get_model(label)
+    post_save.connect(_on_save, sender=model, dispatch_uid=f'search-index-{label}')
+    post_delete.connect(_on_delete, sender=model, dispatch_uid=f'search-unindex-{label}')
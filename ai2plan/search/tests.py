@@ -0,0 +1,87 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounting.models import Account, Category, Transaction
+from leetcode.models import Leetcode
+from todo.models import Todo
+from users.models import User
+from .backends import search_documents
+from .models import SearchDocument
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher', password='pw')
+        cls.other = User.objects.create_user(username='other', password='pw')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _search(self, q, **params):
+        resp = self.client.get('/api/search/', {'q': q, **params})
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return [(r['kind'], r['object_id']) for r in resp.json()['results']]
+
+    def _transaction(self, user, description):
+        account = Account.objects.create(user=user, name='现金')
+        category = Category.objects.create(user=user, name='餐饮', type='expense')
+        return Transaction.objects.create(user=user, date='2026-01-01', amount=10, description=description,
+                                          category=category, account=account)
+
+    def test_index_follows_save_and_delete(self):
+        todo = Todo.objects.create(user=self.user, title='买牛奶', description='超市 milk')
+        problem = Leetcode.objects.create(user=self.user, title='Two Sum', thinking='哈希表 hashmap')
+        tx = self._transaction(self.user, '午饭 noodles')
+        self.assertEqual(self._search('milk'), [('todo', todo.pk)])
+        self.assertEqual(self._search('hashmap'), [('leetcode', problem.pk)])
+        self.assertEqual(self._search('noodles'), [('transaction', tx.pk)])
+
+        todo.description = '超市 bread'
+        todo.save()
+        self.assertEqual(self._search('milk'), [])
+        self.assertEqual(self._search('bread'), [('todo', todo.pk)])
+
+        problem.delete()
+        tx.delete()
+        self.assertEqual(self._search('hashmap'), [])
+        self.assertEqual(self._search('noodles'), [])
+        self.assertFalse(SearchDocument.objects.filter(kind__in=['leetcode', 'transaction']).exists())
+
+    def test_results_are_scoped_to_user(self):
+        mine = Todo.objects.create(user=self.user, title='quarterly report', description='')
+        Todo.objects.create(user=self.other, title='quarterly report', description='')
+        self._transaction(self.other, 'quarterly report dinner')
+        self.assertEqual(self._search('quarterly'), [('todo', mine.pk)])
+        self.assertEqual(self._search('qu'), [('todo', mine.pk)])
+
+    def test_kind_filter(self):
+        todo = Todo.objects.create(user=self.user, title='refactor parser', description='')
+        problem = Leetcode.objects.create(user=self.user, title='parser problem')
+        self.assertEqual(self._search('parser', kind='leetcode'), [('leetcode', problem.pk)])
+        self.assertCountEqual(self._search('parser', kind='todo,leetcode'), [('todo', todo.pk), ('leetcode', problem.pk)])
+        resp = self.client.get('/api/search/', {'q': 'parser', 'kind': 'note'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_ranked_by_relevance(self):
+        weak = Todo.objects.create(user=self.user, title='weekly notes', description='mentions graphs once')
+        strong = Todo.objects.create(user=self.user, title='graphs graphs', description='graphs and more graphs')
+        results = search_documents(self.user, 'graphs')
+        self.assertEqual([r['object_id'] for r in results], [strong.pk, weak.pk])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+    def test_short_terms_fall_back_to_substring_match(self):
+        # trigram 索引无法匹配少于 3 个字符的词，仍应按包含匹配返回
+        todo = Todo.objects.create(user=self.user, title='go 语言', description='')
+        self.assertEqual(self._search('go'), [('todo', todo.pk)])
+        self.assertEqual(self._search('语言'), [('todo', todo.pk)])
+
+    def test_query_syntax_is_escaped(self):
+        literal = Todo.objects.create(user=self.user, title='say "hello" NOT world*', description='')
+        Todo.objects.create(user=self.user, title='hello world', description='')
+        # 引号、NOT、* 按字面匹配，而不是 FTS 运算符
+        self.assertEqual(self._search('"hello" NOT world*'), [('todo', literal.pk)])
+        for q in ('"unbalanced', 'abc)', 'title:abc', 'NEAR(abc def)', 'a OR b'):
+            with self.subTest(q=q):
+                self.assertEqual(self._search(q), [])
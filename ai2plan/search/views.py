@@ -0,0 +1,34 @@
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .backends import search_documents
+from .models import SearchDocument
+
+
+# Create your views here.
+class SearchView(APIView):
+    """
+    统一全文检索：GET /api/search/?q=关键词&kind=todo,leetcode,transaction&limit=20
+    仅检索当前用户的数据，按相关度排序
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 100
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': '请提供查询参数 q'}, status=status.HTTP_400_BAD_REQUEST)
+
+        valid_kinds = {kind for kind, _ in SearchDocument.KIND_CHOICES}
+        kinds = [k for k in request.query_params.get('kind', '').split(',') if k]
+        if any(k not in valid_kinds for k in kinds):
+            return Response({'error': f'kind 仅支持 {", ".join(sorted(valid_kinds))}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit 必须为整数'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search_documents(request.user, query, kinds, limit)
+        return Response({'query': query, 'count': len(results), 'results': results})
@@ -0,0 +1,111 @@
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from todo.models import Todo
+from users.models import User
+
+
+def _worker(user_id, deadline, write_ratio):
+    """
+    单个线程的压测循环，返回 (读延迟列表, 写延迟列表, 锁冲突数, 其他错误数)
+    """
+    rng = random.Random()
+    latencies = {"read": [], "write": []}
+    locked = other = 0
+    try:
+        while time.time() < deadline:
+            kind = "write" if rng.random() < write_ratio else "read"
+            start = time.perf_counter()
+            try:
+                if kind == "write":
+                    # 与视图/工具一致：写入待办并同步检索文档
+                    with transaction.atomic():
+                        Todo.objects.create(user_id=user_id, title="bench", description="bench " * 20)
+                else:
+                    list(Todo.objects.filter(user_id=user_id).order_by("-id")[:50])
+            except OperationalError as e:
+                if "locked" in str(e):
+                    locked += 1
+                else:
+                    other += 1
+                continue
+            latencies[kind].append(time.perf_counter() - start)
+    finally:
+        connections.close_all()
+    return latencies["read"], latencies["write"], locked, other
+
+
+def _process(user_ids, deadline, write_ratio):
+    """
+    一个进程（相当于一个 web worker）内并发跑多个线程
+    """
+    results = []
+    threads = [
+        threading.Thread(target=lambda uid=uid: results.append(_worker(uid, deadline, write_ratio)))
+        for uid in user_ids
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class Command(BaseCommand):
+    help = "并发读写压测当前数据库配置：多进程 × 多线程混合执行待办列表查询与创建，输出吞吐、延迟与锁冲突数"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4, help="进程数，模拟多个 web worker")
+        parser.add_argument("--threads", type=int, default=2, help="每个进程的线程数（每个线程一个数据库连接）")
+        parser.add_argument("--seconds", type=float, default=10, help="压测时长")
+        parser.add_argument("--write-ratio", type=float, default=0.3, help="写操作占比")
+
+    def handle(self, *args, **options):
+        db = connection.settings_dict
+        self.stdout.write(f"数据库: {db['ENGINE'].rsplit('.', 1)[-1]} {db['NAME']} OPTIONS={db.get('OPTIONS') or {}}")
+
+        # 每个线程一个独立用户，压测结束后级联删除
+        user_ids = [
+            User.objects.create_user(username=f"__bench__{uuid.uuid4().hex[:12]}", password=None).pk
+            for _ in range(options["processes"] * options["threads"])
+        ]
+        # 子进程 fork 前关闭连接，避免共享同一个连接
+        connections.close_all()
+        deadline = time.time() + options["seconds"]
+        groups = [user_ids[i::options["processes"]] for i in range(options["processes"])]
+
+        started = time.monotonic()
+        with multiprocessing.get_context("fork").Pool(options["processes"]) as pool:
+            outputs = pool.starmap(_process, [(group, deadline, options["write_ratio"]) for group in groups])
+        elapsed = time.monotonic() - started
+
+        User.objects.filter(pk__in=user_ids).delete()
+
+        reads, writes, locked, other = [], [], 0, 0
+        for results in outputs:
+            for r, w, lk, ot in results:
+                reads.extend(r)
+                writes.extend(w)
+                locked += lk
+                other += ot
+
+        total = len(reads) + len(writes)
+        self.stdout.write(
+            f"{options['processes']} 进程 × {options['threads']} 线程，时长 {elapsed:.1f}s，"
+            f"完成 {total} 次操作，吞吐 {total / elapsed:.0f} ops/s"
+        )
+        for kind, values in (("read", reads), ("write", writes)):
+            if values:
+                values.sort()
+                p95 = values[max(0, int(len(values) * 0.95) - 1)]
+                self.stdout.write(
+                    f"  {kind}: {len(values)} 次，p50 {statistics.median(values) * 1000:.1f}ms，p95 {p95 * 1000:.1f}ms"
+                )
+        self.stdout.write(f"  锁冲突失败 {locked} 次，其他错误 {other} 次")
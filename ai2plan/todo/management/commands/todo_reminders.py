@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from todo.reminders import BATCH_SIZE, POLL_INTERVAL, ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "发送待办到期提醒：默认常驻运行，按下一条截止时间休眠"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="只发送当前已到期的提醒后退出（适合 cron）")
+        parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="最长休眠秒数")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="每批发送的提醒数")
+        parser.add_argument("--lead-minutes", type=float, default=0, help="提前多少分钟提醒")
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(
+            batch_size=options["batch_size"],
+            lead=timedelta(minutes=options["lead_minutes"]),
+        )
+        if options["once"]:
+            sent = scheduler.run_once()
+            self.stdout.write(self.style.SUCCESS(f"已发送 {sent} 条提醒"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"提醒调度已启动，最长 {options['interval']}s 检查一次"))
+        try:
+            scheduler.run_forever(poll_interval=options["interval"])
+        except KeyboardInterrupt:
+            pass
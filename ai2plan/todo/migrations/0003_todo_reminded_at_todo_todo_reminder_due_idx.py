@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0002_todo_todo_user_id_idx_todo_todo_user_open_due_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todo',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('completed', False), ('due_date__isnull', False), ('reminded_at__isnull', True)), fields=['due_date', 'id'], name='todo_reminder_due_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0003_todo_reminded_at_todo_todo_reminder_due_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todo',
+            name='occurrence',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TodoSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, default='')),
+                ('frequency', models.CharField(choices=[('daily', '每天'), ('weekly', '每周'), ('monthly', '每月')], default='daily', max_length=10)),
+                ('interval', models.PositiveIntegerField(default=1)),
+                ('start', models.DateTimeField()),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='todo.todoseries'),
+        ),
+        migrations.AddConstraint(
+            model_name='todo',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence'), name='unique_todo_series_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='todoseries',
+            index=models.Index(fields=['user', 'start'], name='todo_series_user_start_idx'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+import calendar
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 # Create your models here.
@@ -8,6 +12,101 @@ class Todo(models.Model):
     description = models.TextField()
     due_date = models.DateTimeField(null=True, blank=True)
     completed = models.BooleanField(default=False)
+    # 到期提醒已发出的时间；修改截止时间后清空，以便重新提醒
+    reminded_at = models.DateTimeField(null=True, blank=True)
+    # 重复待办的某一次：只有被完成（或单独修改）的那一次才会落库，occurrence 为按规则计算出的原始时间
+    series = models.ForeignKey('TodoSeries', on_delete=models.CASCADE, null=True, blank=True, related_name='occurrences')
+    occurrence = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'occurrence'], name='unique_todo_series_occurrence'),
+        ]
+        # 与列表/筛选的访问路径一致：按用户过滤后按 id 倒序、按完成状态与截止时间筛选
+        indexes = [
+            models.Index(fields=['user', '-id'], name='todo_user_id_idx'),
+            # 布尔列在 SQLite 上会被编译为 "completed"/NOT "completed"，用部分索引才能命中未完成待办
+            models.Index(fields=['user', 'due_date'], condition=models.Q(completed=False), name='todo_user_open_due_idx'),
+            # 提醒调度按截止时间顺序拉取“未完成且未提醒”的待办，只扫描索引中到期的那一段
+            models.Index(fields=['due_date', 'id'], condition=models.Q(completed=False, reminded_at__isnull=True, due_date__isnull=False), name='todo_reminder_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class TodoSeries(models.Model):
+    """
+    重复待办：规则只存一行，列表按查询窗口临时展开各次，不预先生成待办
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', '每天'),
+        ('weekly', '每周'),
+        ('monthly', '每月'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True, default='')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='daily')
+    interval = models.PositiveIntegerField(default=1)  # 每隔几个周期重复一次
+    start = models.DateTimeField()  # 第一次的时间
+    until = models.DateTimeField(null=True, blank=True)  # 最后一次不晚于该时间，为空表示不结束
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'start'], name='todo_series_user_start_idx'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+    def _nth(self, n):
+        """
+        第 n 次（从 0 开始）的时间；按本地时间推算，跨夏令时也保持同一钟点
+        """
+        local = timezone.localtime(self.start)
+        wall = local.replace(tzinfo=None)
+        if self.frequency == 'monthly':
+            months = local.month - 1 + n * self.interval
+            year, month = local.year + months // 12, months % 12 + 1
+            # 31 号之类的日期在短月份取当月最后一天
+            day = min(local.day, calendar.monthrange(year, month)[1])
+            wall = wall.replace(year=year, month=month, day=day)
+        else:
+            days = 7 if self.frequency == 'weekly' else 1
+            wall = wall + timedelta(days=n * days * self.interval)
+        return timezone.make_aware(wall, local.tzinfo)
+
+    def _first_index(self, since):
+        """
+        窗口起点之前的次数直接算出来，不逐次迭代
+        """
+        if since <= self.start:
+            return 0
+        if self.frequency == 'monthly':
+            local_start, local_since = timezone.localtime(self.start), timezone.localtime(since)
+            months = (local_since.year - local_start.year) * 12 + local_since.month - local_start.month
+            return max(0, months // self.interval - 1)
+        days = 7 if self.frequency == 'weekly' else 1
+        period = timedelta(days=days * self.interval)
+        # 减一次以抵消夏令时带来的一小时偏差，下面的循环会跳过多出来的这一次
+        return max(0, (since - self.start) // period - 1)
+
+    def occurrences_between(self, since, until):
+        """
+        产出 [since, until] 内的各次时间
+        """
+        if self.until is not None:
+            until = min(until, self.until)
+        n = self._first_index(since)
+        while True:
+            moment = self._nth(n)
+            if moment > until:
+                return
+            if moment >= since:
+                yield moment
+            n += 1
+
+    def is_occurrence(self, moment):
+        return any(m == moment for m in self.occurrences_between(moment, moment))
@@ -0,0 +1,133 @@
+"""
+待办到期提醒：按截止时间顺序分批拉取到期且未提醒的待办，交给可替换的发送端（sink）
+
+拉取走部分索引 todo_reminder_due_idx，每次只读取索引中已到期的一段，
+与待办总量无关；没有到期项时按下一条截止时间休眠，而不是固定频率全表轮询。
+"""
+import json
+import logging
+import os
+import time
+import urllib.request
+from datetime import timedelta
+from functools import lru_cache
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Todo
+
+logger = logging.getLogger("todo.reminders")
+
+BATCH_SIZE = 500
+POLL_INTERVAL = 60.0
+
+
+class LogSink:
+    """
+    默认发送端：写日志，便于本地开发观察
+    """
+    def send(self, reminders):
+        for item in reminders:
+            logger.info("待办到期提醒 user=%s todo=%s 「%s」 截止于 %s",
+                        item['user_id'], item['id'], item['title'], item['due_date'])
+
+
+class WebhookSink:
+    """
+    把一批提醒以 JSON POST 到 webhook（可替换为邮件、推送等渠道）
+    """
+    def __init__(self, url, timeout=10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, reminders):
+        body = json.dumps({'reminders': reminders}, ensure_ascii=False, default=str).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"webhook 返回 {response.status}")
+
+
+# 进程内共享一个发送端（单例），由 REMINDER_SINK 选择 log/webhook
+@lru_cache(maxsize=1)
+def get_reminder_sink():
+    kind = os.getenv("REMINDER_SINK", "log").lower()
+    if kind == "webhook":
+        url = os.getenv("REMINDER_WEBHOOK_URL")
+        if not url:
+            raise RuntimeError("REMINDER_SINK=webhook 需要配置 REMINDER_WEBHOOK_URL")
+        return WebhookSink(url, timeout=float(os.getenv("REMINDER_WEBHOOK_TIMEOUT", "10")))
+    return LogSink()
+
+
+def pending_reminders():
+    """
+    未完成、未提醒、有截止时间的待办，与部分索引 todo_reminder_due_idx 的条件一致
+    """
+    return Todo.objects.filter(completed=False, reminded_at__isnull=True, due_date__isnull=False)
+
+
+class ReminderScheduler:
+    def __init__(self, sink=None, batch_size=BATCH_SIZE, lead=timedelta(0)):
+        """
+        Args:
+            sink: 提供 send(reminders) 的发送端，默认按环境变量选择
+            batch_size: 每批拉取并发送的待办数
+            lead: 提前多久提醒（截止时间 - lead 到达即发送）
+        """
+        self.sink = sink or get_reminder_sink()
+        self.batch_size = batch_size
+        self.lead = lead
+        self.stats = {'sent': 0, 'batches': 0}
+
+    def _claim_batch(self, now):
+        queryset = pending_reminders().filter(due_date__lte=now + self.lead).order_by('due_date', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            # 多个调度进程并行时互不重复领取
+            queryset = queryset.select_for_update(skip_locked=True)
+        return list(queryset.values('id', 'user_id', 'title', 'due_date')[:self.batch_size])
+
+    def run_once(self, now=None):
+        """
+        发送所有已到期的提醒，返回发送条数。发送失败的批次回滚，下次重试
+        """
+        now = now or timezone.now()
+        sent = 0
+        while True:
+            with transaction.atomic():
+                batch = self._claim_batch(now)
+                if not batch:
+                    break
+                self.sink.send(batch)
+                Todo.objects.filter(pk__in=[item['id'] for item in batch]).update(reminded_at=now)
+            sent += len(batch)
+            self.stats['batches'] += 1
+            if len(batch) < self.batch_size:
+                break
+        self.stats['sent'] += sent
+        return sent
+
+    def next_due(self):
+        """
+        下一条待提醒的触发时间，只读索引的第一项
+        """
+        due = pending_reminders().order_by('due_date', 'id').values_list('due_date', flat=True).first()
+        return due - self.lead if due else None
+
+    def run_forever(self, poll_interval=POLL_INTERVAL):
+        """
+        发送到期提醒后休眠到下一条截止时间；poll_interval 为最长休眠时间，
+        以便及时发现新建或改期的待办
+        """
+        while True:
+            try:
+                self.run_once()
+                due = self.next_due()
+            except Exception as e:
+                logger.error(f"发送待办提醒失败: {e}")
+                due = None
+            wait = poll_interval
+            if due is not None:
+                wait = min(poll_interval, max(0.0, (due - timezone.now()).total_seconds()))
+            time.sleep(wait)
@@ -1,9 +1,77 @@
+import datetime
+
 from rest_framework import serializers
-from .models import Todo
+from .models import Todo, TodoSeries
 
 class TodoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Todo
         fields = '__all__'
-        read_only_fields = ['user']
\ No newline at end of file
+        read_only_fields = ['user', 'reminded_at', 'series', 'occurrence']
+
+
+class TodoBulkSerializer(serializers.Serializer):
+    """
+    批量操作的目标：ids 列表或 filter 筛选条件（与列表接口的查询参数一致），二者必选其一
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=10000)
+    filter = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        if 'ids' not in attrs and 'filter' not in attrs:
+            raise serializers.ValidationError('需要提供 ids 或 filter')
+        # 空筛选条件会选中全部待办，批量操作必须显式给出条件
+        if 'filter' in attrs and not any(str(value).strip() for value in attrs['filter'].values() if value is not None):
+            raise serializers.ValidationError({'filter': 'filter 至少需要一个非空条件'})
+        return attrs
+
+
+class TodoRescheduleSerializer(TodoBulkSerializer):
+    """
+    改期：due_date 设为指定时间，或 shift_hours 在原截止时间上整体平移
+    """
+    due_date = serializers.DateTimeField(required=False, allow_null=True)
+    shift_hours = serializers.FloatField(required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if ('due_date' in attrs) == ('shift_hours' in attrs):
+            raise serializers.ValidationError('due_date 与 shift_hours 需且只能提供一个')
+        return attrs
+
+
+class TodoSeriesSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = TodoSeries
+        fields = '__all__'
+        read_only_fields = ['user']
+
+    def validate(self, attrs):
+        start = attrs.get('start', getattr(self.instance, 'start', None))
+        until = attrs.get('until', getattr(self.instance, 'until', None))
+        if until is not None and start is not None and until < start:
+            raise serializers.ValidationError('until 不能早于 start')
+        if attrs.get('interval', 1) < 1:
+            raise serializers.ValidationError('interval 至少为 1')
+        return attrs
+
+
+class OccurrenceSerializer(serializers.Serializer):
+    occurrence = serializers.DateTimeField()
+
+
+class AgendaQuerySerializer(serializers.Serializer):
+    """
+    agenda 查询窗口，最长一年，避免无限展开
+    """
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+    def validate(self, attrs):
+        if attrs['end'] < attrs['start']:
+            raise serializers.ValidationError('end 不能早于 start')
+        if attrs['end'] - attrs['start'] > datetime.timedelta(days=366):
+            raise serializers.ValidationError('查询窗口不能超过一年')
+        return attrs
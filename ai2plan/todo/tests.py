@@ -1,3 +1,227 @@
+from unittest import skipUnless
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from search.models import SearchDocument
+from .models import Todo, TodoSeries
+from .reminders import ReminderScheduler, pending_reminders
+
+
+@skipUnless(connection.vendor == 'sqlite', '查询计划断言基于 SQLite 的 EXPLAIN QUERY PLAN 输出')
+class TodoQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='plan', password='pw')
+
+    def test_list_uses_user_id_index(self):
+        plan = Todo.objects.filter(user=self.user).order_by('-id').explain()
+        self.assertIn('USING INDEX todo_user_id_idx', plan)
+
+    def test_open_todos_by_due_date_use_partial_index(self):
+        plan = Todo.objects.filter(user=self.user, completed=False).order_by('due_date').explain()
+        self.assertIn('USING INDEX todo_user_open_due_idx', plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+    def test_due_reminders_use_partial_index(self):
+        plan = pending_reminders().filter(due_date__lte=timezone.now()).order_by('due_date', 'id').explain()
+        self.assertIn('USING INDEX todo_reminder_due_idx', plan)
+        self.assertNotIn('USE TEMP B-TREE', plan)
+
+
+class TodoBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='bulk', password='pw')
+        cls.other = User.objects.create_user(username='other', password='pw')
+        for i in range(6):
+            Todo.objects.create(user=cls.user, title=f't{i}', description='', completed=i < 2)
+        cls.foreign = Todo.objects.create(user=cls.other, title='x', description='')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_complete_by_ids_is_one_update_scoped_to_user(self):
+        ids = list(Todo.objects.values_list('id', flat=True))
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/todos/bulk/complete/', {'ids': ids}, format='json')
+        self.assertEqual(response.json(), {'affected': 6})
+        self.foreign.refresh_from_db()
+        self.assertFalse(self.foreign.completed)
+
+    def test_delete_completed_by_filter_removes_search_documents(self):
+        response = self.client.post('/api/todos/bulk/delete/', {'filter': {'completed': True}}, format='json')
+        self.assertEqual(response.json(), {'affected': 2})
+        self.assertEqual(Todo.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(SearchDocument.objects.filter(user=self.user, kind='todo').count(), 4)
+
+    def test_selection_is_required(self):
+        response = self.client.post('/api/todos/bulk/uncomplete/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_or_unknown_filter_is_rejected(self):
+        for selection in ({}, {'completed': ''}, {'title': '  ', 'completed': None}, {'nosuch': 'x'}):
+            with self.subTest(filter=selection):
+                response = self.client.post('/api/todos/bulk/delete/', {'filter': selection}, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Todo.objects.filter(user=self.user).count(), 6)
+
+    def test_reschedule_shifts_existing_due_dates(self):
+        due = timezone.now().replace(microsecond=0)
+        Todo.objects.filter(user=self.user).update(due_date=due, reminded_at=due)
+        dated = list(Todo.objects.filter(user=self.user, completed=False).values_list('id', flat=True))
+        undated = Todo.objects.create(user=self.user, title='no due', description='')
+        response = self.client.post('/api/todos/bulk/reschedule/',
+                                    {'ids': dated + [undated.id, self.foreign.id], 'shift_hours': 1.5}, format='json')
+        self.assertEqual(response.json(), {'affected': 5})
+        for todo in Todo.objects.filter(pk__in=dated):
+            self.assertEqual(todo.due_date, due + timedelta(hours=1.5))
+            self.assertIsNone(todo.reminded_at)
+        undated.refresh_from_db()
+        self.assertIsNone(undated.due_date)
+        # 未选中的待办保持原截止时间
+        for todo in Todo.objects.filter(user=self.user, completed=True):
+            self.assertEqual(todo.due_date, due)
+        self.foreign.refresh_from_db()
+        self.assertIsNone(self.foreign.due_date)
+
+
+class TodoPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pager', password='pw')
+        Todo.objects.bulk_create(Todo(user=cls.user, title=f't{i}', description='') for i in range(5))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_next_and_previous_links(self):
+        first = self._page('/api/todos/', page_size=2)
+        self.assertIsNone(first['previous'])
+        second = self._page(first['next'])
+        back = self._page(second['previous'])
+        self.assertEqual([t['id'] for t in back['results']], [t['id'] for t in first['results']])
+
+        ids, page = [], first
+        while True:
+            ids += [t['id'] for t in page['results']]
+            if not page['next']:
+                break
+            page = self._page(page['next'])
+        expected = list(Todo.objects.filter(user=self.user).order_by('-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_page_size_is_capped(self):
+        Todo.objects.bulk_create(Todo(user=self.user, title=f'more{i}', description='') for i in range(200))
+        self.assertEqual(len(self._page('/api/todos/', page_size=1000)['results']), 200)
+        self.assertEqual(len(self._page('/api/todos/')['results']), 50)
+
+    def test_order_is_stable_when_rows_are_added(self):
+        first = self._page('/api/todos/', page_size=2)
+        # 翻页期间新增的记录不会让后续页重复或跳过已有记录
+        Todo.objects.create(user=self.user, title='new', description='')
+        second = self._page(first['next'])
+        seen = [t['id'] for t in first['results'] + second['results']]
+        expected = list(Todo.objects.filter(user=self.user, title__startswith='t').order_by('-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected[:4])
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    def send(self, reminders):
+        self.batches.append(reminders)
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='remind', password='pw')
+        self.now = timezone.now()
+        for hours in (-3, -2, -1, 5):
+            Todo.objects.create(user=self.user, title=f'{hours}', description='', due_date=self.now + timedelta(hours=hours))
+        Todo.objects.create(user=self.user, title='done', description='', due_date=self.now, completed=True)
+        Todo.objects.create(user=self.user, title='none', description='')
+
+    def test_sends_due_todos_in_time_order_once(self):
+        sink = ListSink()
+        scheduler = ReminderScheduler(sink=sink, batch_size=2)
+        self.assertEqual(scheduler.run_once(self.now), 3)
+        self.assertEqual([[r['title'] for r in b] for b in sink.batches], [['-3', '-2'], ['-1']])
+        self.assertEqual(scheduler.run_once(self.now), 0)
+        self.assertEqual(scheduler.next_due(), Todo.objects.get(title='5').due_date)
+
+    def test_failed_delivery_is_retried(self):
+        class FailingSink:
+            def send(self, reminders):
+                raise RuntimeError('down')
+
+        with self.assertRaises(RuntimeError):
+            ReminderScheduler(sink=FailingSink()).run_once(self.now)
+        self.assertEqual(ReminderScheduler(sink=ListSink()).run_once(self.now), 3)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class TodoSeriesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='series', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_monthly_occurrences_clamp_to_month_end(self):
+        series = TodoSeries(user=self.user, title='rent', frequency='monthly', start=utc(2026, 1, 31, 9))
+        self.assertEqual(
+            list(series.occurrences_between(utc(2026, 2, 1), utc(2026, 4, 30, 23))),
+            [utc(2026, 2, 28, 9), utc(2026, 3, 31, 9), utc(2026, 4, 30, 9)],
+        )
+
+    def test_window_far_from_start_skips_earlier_occurrences(self):
+        series = TodoSeries(user=self.user, title='gym', frequency='weekly', interval=2, start=utc(2025, 1, 6, 18))
+        moments = list(series.occurrences_between(utc(2026, 3, 1), utc(2026, 3, 31)))
+        self.assertEqual(moments, [utc(2026, 3, 2, 18), utc(2026, 3, 16, 18), utc(2026, 3, 30, 18)])
+        self.assertTrue(series.is_occurrence(utc(2026, 3, 16, 18)))
+        self.assertFalse(series.is_occurrence(utc(2026, 3, 9, 18)))
+
+    def test_agenda_expands_lazily_and_materialises_on_complete(self):
+        series = TodoSeries.objects.create(user=self.user, title='run', frequency='daily', start=utc(2026, 1, 1, 7))
+        response = self.client.post(f'/api/todo-series/{series.id}/complete/',
+                                    {'occurrence': '2026-03-02T07:00:00Z'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Todo.objects.filter(series=series).count(), 1)
+
+        with self.assertNumQueries(2):
+            items = self.client.get('/api/todos/agenda/', {
+                'start': '2026-03-01T00:00:00Z', 'end': '2026-03-07T23:59:59Z',
+            }).json()
+        self.assertEqual(len(items), 7)
+        self.assertEqual([item['completed'] for item in items[:2]], [False, True])
+        self.assertIsNotNone(items[1]['id'])
+        self.assertIsNone(items[0]['id'])
+
+    def test_agenda_orders_occurrence_with_cleared_due_date(self):
+        series = TodoSeries.objects.create(user=self.user, title='run', frequency='daily', start=utc(2026, 1, 1, 7))
+        self.client.post(f'/api/todo-series/{series.id}/complete/', {'occurrence': '2026-03-02T07:00:00Z'}, format='json')
+        todo = Todo.objects.get(series=series)
+        response = self.client.patch(f'/api/todos/{todo.id}/', {'due_date': None}, format='json')
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+        response = self.client.get('/api/todos/agenda/', {'start': '2026-03-01T00:00:00Z', 'end': '2026-03-03T23:59:59Z'})
+        self.assertEqual(response.status_code, 200)
+        items = response.json()
+        self.assertEqual([item['id'] for item in items], [None, todo.id, None])
+        self.assertIsNone(items[1]['due_date'])
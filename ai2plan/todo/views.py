@@ -1,8 +1,19 @@
+import datetime
+
 from rest_framework import viewsets
-from .models import Todo
-from .serializers import TodoSerializer
+from .models import Todo, TodoSeries
+from .serializers import (
+    AgendaQuerySerializer, OccurrenceSerializer, TodoBulkSerializer, TodoRescheduleSerializer,
+    TodoSerializer, TodoSeriesSerializer,
+)
 from rest_framework import permissions
-from rest_framework.exceptions import PermissionDenied
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import F, Q
+from search.indexing import unindex_queryset
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -31,7 +42,151 @@ class TodoViewSet(viewsets.ModelViewSet):
         # 禁止修改他人的待办
         if serializer.instance.user != self.request.user:
             raise PermissionDenied("无权修改此待办")
-        serializer.save()
+        if 'due_date' in serializer.validated_data and serializer.validated_data['due_date'] != serializer.instance.due_date:
+            # 截止时间变了，重新进入提醒队列
+            serializer.save(reminded_at=None)
+        else:
+            serializer.save()
+
+    @action(detail=False, methods=['get'])
+    def agenda(self, request):
+        """
+        ?start=&end= 窗口内的待办：普通待办 + 重复待办按规则展开的各次，
+        已落库（完成或单独修改过）的那一次以库中记录为准。
+        列表接口按 id 游标分页，不展开重复待办，未落库的各次只在这里出现
+        """
+        query = AgendaQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        start, end = query.validated_data['start'], query.validated_data['end']
+
+        rows = list(
+            Todo.objects.filter(user=request.user).filter(
+                Q(series__isnull=True, due_date__range=(start, end))
+                | Q(series__isnull=False, occurrence__range=(start, end))
+            )
+        )
+        materialised = {(row.series_id, row.occurrence) for row in rows if row.series_id}
+        # 落库的重复待办可能被单独清空截止时间，此时按它原本所在的那一次排序
+        items = [(row.due_date or row.occurrence, data) for row, data in zip(rows, TodoSerializer(rows, many=True).data)]
+
+        series_list = TodoSeries.objects.filter(user=request.user, start__lte=end).filter(
+            Q(until__isnull=True) | Q(until__gte=start)
+        )
+        as_text = serializers.DateTimeField().to_representation
+        for series in series_list:
+            for moment in series.occurrences_between(start, end):
+                if (series.id, moment) in materialised:
+                    continue
+                # 未落库的一次没有 id，完成时调用 todo-series/{id}/complete/
+                items.append((moment, {
+                    'id': None,
+                    'series': series.id,
+                    'occurrence': as_text(moment),
+                    'title': series.title,
+                    'description': series.description,
+                    'due_date': as_text(moment),
+                    'completed': False,
+                }))
+        items.sort(key=lambda pair: pair[0])
+        return Response([data for _, data in items])
+
+    # ============ 批量操作：每个接口只执行一条 UPDATE/DELETE ============
+    def _bulk_queryset(self, data):
+        """
+        校验后的 ids/filter -> 当前用户的查询集
+        """
+        queryset = Todo.objects.filter(user=self.request.user)
+        if 'ids' in data:
+            queryset = queryset.filter(pk__in=data['ids'])
+        if 'filter' in data:
+            unknown = set(data['filter']) - set(TodoFilter.base_filters)
+            if unknown:
+                # 未知条件会被 django-filter 忽略，等同于选中全部待办
+                raise ValidationError({'filter': f'不支持的筛选条件：{", ".join(sorted(unknown))}'})
+            filterset = TodoFilter(data=data['filter'], queryset=queryset, request=self.request)
+            if not filterset.is_valid():
+                raise ValidationError({'filter': filterset.errors})
+            queryset = filterset.qs
+        return queryset
+
+    def _bulk_update(self, request, **values):
+        serializer = TodoBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        affected = self._bulk_queryset(serializer.validated_data).update(**values)
+        return Response({'affected': affected})
+
+    @action(detail=False, methods=['post'], url_path='bulk/complete')
+    def bulk_complete(self, request):
+        return self._bulk_update(request, completed=True)
+
+    @action(detail=False, methods=['post'], url_path='bulk/uncomplete')
+    def bulk_uncomplete(self, request):
+        return self._bulk_update(request, completed=False)
+
+    @action(detail=False, methods=['post'], url_path='bulk/reschedule')
+    def bulk_reschedule(self, request):
+        serializer = TodoRescheduleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = self._bulk_queryset(data)
+        if 'shift_hours' in data:
+            # 没有截止时间的待办平移后仍为空
+            due_date = F('due_date') + datetime.timedelta(hours=data['shift_hours'])
+        else:
+            due_date = data['due_date']
+        return Response({'affected': queryset.update(due_date=due_date, reminded_at=None)})
+
+    @action(detail=False, methods=['post'], url_path='bulk/delete')
+    def bulk_delete(self, request):
+        serializer = TodoBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = self._bulk_queryset(serializer.validated_data)
+        with transaction.atomic():
+            # 检索文档先按查询集一次删除，post_delete 信号里的逐行删除随后为空操作
+            unindex_queryset(queryset)
+            _, per_model = queryset.delete()
+        affected = per_model.get(Todo._meta.label, 0)
+        return Response({'affected': affected})
+
+
+class TodoSeriesViewSet(viewsets.ModelViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = TodoSeriesSerializer
+
+    def get_queryset(self):
+        return TodoSeries.objects.filter(user=self.request.user).order_by('-id')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def _materialise(self, series, occurrence, completed):
+        """
+        只有完成/取消完成某一次时才为它写入一行待办
+        """
+        if not series.is_occurrence(occurrence):
+            raise ValidationError({'occurrence': '该时间不是此重复待办的某一次'})
+        todo, created = Todo.objects.get_or_create(
+            series=series, occurrence=occurrence,
+            defaults={
+                'user': series.user, 'title': series.title, 'description': series.description,
+                'due_date': occurrence, 'completed': completed,
+            },
+        )
+        if not created and todo.completed != completed:
+            todo.completed = completed
+            todo.save(update_fields=['completed'])
+        return todo
 
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        data = OccurrenceSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        todo = self._materialise(self.get_object(), data.validated_data['occurrence'], True)
+        return Response(TodoSerializer(todo).data)
 
-        
\ No newline at end of file
+    @action(detail=True, methods=['post'])
+    def uncomplete(self, request, pk=None):
+        data = OccurrenceSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        todo = self._materialise(self.get_object(), data.validated_data['occurrence'], False)
+        return Response(TodoSerializer(todo).data)
@@ -0,0 +1,101 @@
+"""
+JWT 认证：信任签名令牌中的用户 id，按请求构造轻量用户对象，
+账号状态（是否启用、密码指纹）放在进程内短 TTL 缓存中，缓存命中时认证不查库
+"""
+import os
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+# 构造轻量用户时加载的字段，其余字段（密码、邮箱等）按需延迟加载；
+# Model.from_db 要求按模型字段定义顺序传值
+USER_FIELDS = tuple(
+    f.attname for f in User._meta.concrete_fields
+    if f.attname in {'userid', 'username', 'is_active', 'is_staff', 'is_superuser'}
+)
+MAX_ENTRIES = 10000
+
+
+class UserStateCache:
+    """
+    user id -> (过期时间, 字段值, 密码指纹)。用户保存或删除时由信号失效；
+    多进程部署下其他进程的缓存最迟 ttl 秒后更新
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1:]
+
+    def set(self, key, values, password_hash):
+        with self._lock:
+            if len(self._data) >= MAX_ENTRIES:
+                # 先清过期项，仍然满时丢弃最早写入的
+                now = time.monotonic()
+                for k in [k for k, v in self._data.items() if v[0] < now]:
+                    del self._data[k]
+                if len(self._data) >= MAX_ENTRIES:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (time.monotonic() + self.ttl, values, password_hash)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_state_cache = UserStateCache(ttl=float(os.getenv("AUTH_USER_CACHE_TTL", "60")))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    与 JWTAuthentication 行为一致（用户不存在/已停用/改密后令牌失效均拒绝），
+    但每个用户在 TTL 内只查一次库；AUTH_USER_CACHE_TTL=0 时退回每次查库
+    """
+
+    def get_user(self, validated_token):
+        if user_state_cache.ttl <= 0:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        key = str(user_id)
+        cached = user_state_cache.get(key)
+        if cached is None:
+            row = (
+                User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values_list(*USER_FIELDS, 'password')
+                .first()
+            )
+            if row is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cached = (row[:-1], get_md5_hash_password(row[-1]))
+            user_state_cache.set(key, *cached)
+        values, password_hash = cached
+
+        # 每个请求一个新实例，避免请求之间共享可变状态
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+
+from .authentication import user_state_cache
+from .models import User
+
+
+def _invalidate(sender, instance, **kwargs):
+    # 改密、停用、删除后立即让本进程的认证缓存失效
+    user_state_cache.invalidate(str(instance.pk))
+
+
+post_save.connect(_invalidate, sender=User, dispatch_uid='users-auth-cache-save')
+post_delete.connect(_invalidate, sender=User, dispatch_uid='users-auth-cache-delete')
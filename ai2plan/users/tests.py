@@ -1,3 +1,32 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import user_state_cache
+from .models import User
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_state_cache.clear()
+        self.user = User.objects.create_user(username='auth', password='pw')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_user_state_is_cached_between_requests(self):
+        # 第一次：加载用户 + 统计查询；之后认证不再查库
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/leetcode/stats/').status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/leetcode/stats/').status_code, 200)
+
+    def test_deactivation_invalidates_cache(self):
+        self.assertEqual(self.client.get('/api/leetcode/stats/').status_code, 200)
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get('/api/leetcode/stats/').status_code, 401)
+
+    def test_lightweight_user_works_for_writes(self):
+        response = self.client.post('/api/todos/', {'title': 't', 'description': 'd'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['user'], str(self.user.pk))